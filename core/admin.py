@@ -1,7 +1,5 @@
 import csv
 
-import qrcode
-from datauri import DataURI
 from django import forms
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
@@ -9,22 +7,22 @@ from django.http.response import Http404, HttpResponse
 from django.shortcuts import render
 from django.urls import path
 from django.urls.base import reverse
+from django.utils.html import format_html_join
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext as _
 from django_better_admin_arrayfield.admin.mixins import DynamicArrayMixin
-from qrcode.image.svg import SvgPathFillImage
 
+from core import qr, roles
 from core.models import *
 
 
-def with_inline_organization_permissions(get_organization=lambda x: x):
+def with_inline_organization_permissions(get_organization_id=lambda x: x.id):
     def deco(cls):
         class Admin(cls):
             def has_view_permission(self, request, obj=None):
                 if obj is None or request.user.is_superuser:
                     return True
-                org = get_organization(obj)
-                return org.is_admin(request.user) or org.is_advisor(request.user)
+                return roles.get_roles(request).can_manage(get_organization_id(obj))
 
             def has_change_permission(self, request, obj=None):
                 return self.has_view_permission(request, obj)
@@ -49,7 +47,7 @@ def with_organization_permissions():
             def has_view_permission(self, request, obj=None):
                 if obj is None or request.user.is_superuser:
                     return True
-                return obj.organization.is_admin(request.user) or obj.organization.is_advisor(request.user)
+                return roles.get_roles(request).can_manage(obj.organization_id)
 
             def has_change_permission(self, request, obj=None):
                 return self.has_view_permission(request, obj)
@@ -61,9 +59,7 @@ def with_organization_permissions():
                 qs = super().get_queryset(request)
                 if request.user.is_superuser:
                     return qs
-                return qs.filter(
-                    Q(**{f"organization__admins": request.user}) | Q(**{f"organization__advisors": request.user})
-                ).distinct()
+                return qs.filter(organization__in=roles.get_roles(request).organization_ids)
 
             def get_form(self, request, obj=None, change=False, **kwargs):
                 if not request.user.is_superuser:
@@ -72,10 +68,9 @@ def with_organization_permissions():
                     class UserForm(form_class):
                         def __init__(self, *args, **kwargs):
                             super().__init__(*args, **kwargs)
-                            q = Q(admins=request.user) | Q(advisors=request.user)
                             if "organization" in self.fields:
-                                self.fields["organization"].queryset = (
-                                    self.fields["organization"].queryset.filter(q).distinct()
+                                self.fields["organization"].queryset = self.fields["organization"].queryset.filter(
+                                    id__in=roles.get_roles(request).organization_ids
                                 )
 
                     kwargs["form"] = UserForm
@@ -96,7 +91,7 @@ class AdminAdvisorListFilter(admin.SimpleListFilter):
         if request.user.is_superuser:
             orgs = Organization.objects.all()
         else:
-            orgs = Organization.objects.filter(Q(admins=request.user) | Q(advisors=request.user)).distinct()
+            orgs = Organization.objects.filter(id__in=roles.get_roles(request).organization_ids)
         return [(org.id, org.name) for org in orgs]
 
     def queryset(self, request, queryset):
@@ -114,9 +109,7 @@ class EventListFilter(admin.SimpleListFilter):
         if request.user.is_superuser:
             events = Event.objects.all()
         else:
-            events = Event.objects.filter(
-                Q(organization__admins=request.user) | Q(organization__advisors=request.user)
-            ).distinct()
+            events = Event.objects.filter(organization__in=roles.get_roles(request).organization_ids)
         return [(event.id, event) for event in events]
 
     def queryset(self, request, queryset):
@@ -201,7 +194,7 @@ class OrganizationAdmin(admin.ModelAdmin, DynamicArrayMixin):
                 "ical_links",
             )
 
-    list_display = ("name", "type", "day", "time", "location", "points_link")
+    list_display = ("name", "type", "day", "time", "location", "active_member_count", "points_link")
     list_filter = ("type", "day", "category")
     readonly_fields = ("points_link",)
     autocomplete_fields = ("advisors", "admins")
@@ -213,7 +206,7 @@ class OrganizationAdmin(admin.ModelAdmin, DynamicArrayMixin):
     def has_view_permission(self, request, obj=None):
         if obj is None or request.user.is_superuser:
             return True
-        return obj.is_admin(request.user) or obj.is_advisor(request.user)
+        return roles.get_roles(request).can_manage(obj.id)
 
     def has_change_permission(self, request, obj=None):
         return self.has_view_permission(request, obj)
@@ -222,11 +215,11 @@ class OrganizationAdmin(admin.ModelAdmin, DynamicArrayMixin):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
             return qs
-        return qs.filter(Q(admins=request.user) | Q(advisors=request.user)).distinct()
+        return qs.filter(id__in=roles.get_roles(request).organization_ids)
 
     def get_form(self, request, obj=None, **kwargs):
         if not request.user.is_superuser:
-            kwargs["form"] = self.AdvisorForm if obj.is_advisor(request.user) else self.AdminForm
+            kwargs["form"] = self.AdvisorForm if roles.get_roles(request).is_advisor(obj.id) else self.AdminForm
         return super().get_form(request, obj=obj, **kwargs)
 
     def points_link(self, obj):
@@ -310,20 +303,18 @@ class EventAdmin(admin.ModelAdmin, DynamicArrayMixin):
 
     list_filter = (AdminAdvisorListFilter,)
     date_hierarchy = "start"
-    list_display = ("name", "organization", "start", "end", "points", "user_count")
+    list_display = ("name", "organization", "start", "end", "points", "submission_count")
+    list_select_related = ("organization",)
     search_fields = ("name",)
     readonly_fields = ("code", "qr_code", "sign_in")
-
-    def user_count(self, obj):
-        return obj.users.count()
+    actions = ("print_qr_codes",)
 
     @admin.display(description="QR Code")
     def qr_code(self, obj):
         if obj.code is None:
             return "-"
-        qr_svg = qrcode.make(f"lhs://{obj.code}", image_factory=SvgPathFillImage, box_size=50, border=0)
-        uri_svg = DataURI.make("image/svg+xml", charset="UTF-8", base64=True, data=qr_svg.to_string())
-        return mark_safe(f'<img src="{uri_svg}" alt="lhs://{obj.code}">')
+        uri_svg = qr.to_data_uri(qr.get_svg(obj.code))
+        return mark_safe(f'<img src="{uri_svg}" alt="{qr.event_url(obj.code)}">')
 
     @admin.display(description="Sign In Instructions")
     def sign_in(self, obj):
@@ -339,6 +330,15 @@ class EventAdmin(admin.ModelAdmin, DynamicArrayMixin):
     def has_add_permission(self, request):
         return True
 
+    @admin.action(description="Print QR codes for selected events")
+    def print_qr_codes(self, request, queryset):
+        events = list(queryset.filter(code__isnull=False).select_related("organization").order_by("start"))
+        svgs = qr.get_svgs(x.code for x in events)
+        context = dict(
+            events=[dict(event=x, url=qr.event_url(x.code), qr_code=qr.to_data_uri(svgs[x.code])) for x in events],
+        )
+        return render(request, "core/event_qr_codes.html", context)
+
 
 @admin.register(Membership)
 @with_organization_permissions()
@@ -363,10 +363,7 @@ class SubmissionAdmin(admin.ModelAdmin, DynamicArrayMixin):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
             return qs
-        events = Event.objects.filter(
-            Q(**{f"organization__admins": request.user}) | Q(**{f"organization__advisors": request.user})
-        )
-        return qs.filter(event__in=events)
+        return qs.filter(event__organization__in=roles.get_roles(request).organization_ids)
 
     list_filter = (EventListFilter,)
     search_fields = ("event__name", "user__first_name", "user__last_name")
@@ -383,7 +380,7 @@ class SubmissionAdmin(admin.ModelAdmin, DynamicArrayMixin):
     def has_view_permission(self, request, obj=None):
         if obj is None or request.user.is_superuser:
             return True
-        return obj.event.organization.is_admin(request.user) or obj.event.organization.is_advisor(request.user)
+        return roles.get_roles(request).can_manage(obj.event.organization_id)
 
     def has_change_permission(self, request, obj=None):
         return self.has_view_permission(request, obj)
@@ -398,9 +395,7 @@ class SubmissionAdmin(admin.ModelAdmin, DynamicArrayMixin):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
             return qs
-        return qs.filter(
-            Q(**{f"event__organization__admins": request.user}) | Q(**{f"event__organization__advisors": request.user})
-        ).distinct()
+        return qs.filter(event__organization__in=roles.get_roles(request).organization_ids)
 
     def get_form(self, request, obj=None, change=False, **kwargs):
         if not request.user.is_superuser:
@@ -409,9 +404,9 @@ class SubmissionAdmin(admin.ModelAdmin, DynamicArrayMixin):
             class UserForm(form_class):
                 def __init__(self, *args, **kwargs):
                     super().__init__(*args, **kwargs)
-                    q = Q(organization__admins=request.user) | Q(organization__advisors=request.user)
                     self.fields["event"].queryset = (
-                        self.fields["event"].queryset.filter(q).order_by("-start").distinct()
+                        self.fields["event"].queryset.filter(organization__in=roles.get_roles(request).organization_ids)
+                        .order_by("-start")
                     )
 
             kwargs["form"] = UserForm
@@ -422,10 +417,17 @@ class SubmissionAdmin(admin.ModelAdmin, DynamicArrayMixin):
 @admin.register(Post)
 @with_organization_permissions()
 class PostAdmin(admin.ModelAdmin, DynamicArrayMixin):
-    @with_inline_organization_permissions(lambda x: x.organization)
+    @with_inline_organization_permissions(lambda x: x.organization_id)
     class InlinePollAdmin(admin.StackedInline, DynamicArrayMixin):
         model = Poll
         extra = 0
+        readonly_fields = ("results",)
+
+        @admin.display(description="Results")
+        def results(self, obj):
+            if obj.pk is None or obj.type != PollType.SELECT:
+                return "-"
+            return format_html_join(mark_safe("<br>"), "{}: {}", ((x["choice"], x["count"]) for x in obj.get_results()))
 
     class AdminAdvisorForm(forms.ModelForm):
         class Meta:
@@ -0,0 +1,188 @@
+import calendar
+from datetime import date, datetime, time, timedelta
+
+from django.core import signing
+from django.core.cache import cache
+from django.utils import timezone
+
+from core import caching, db, models
+
+GLOBAL_VERSION = "agenda"
+CACHE_TIMEOUT = 7 * 24 * 60 * 60
+FEED_MONTHS = (-1, 0, 1, 2)
+FEED_SALT = "core.agenda.feed"
+MEETING_LENGTH = timedelta(hours=1)
+# Keeps month arithmetic and timezone conversion well inside what date and datetime support
+MIN_YEAR, MAX_YEAR = 1900, 2999
+
+
+def parse_month(value):
+    if not value:
+        today = timezone.localdate()
+        return today.year, today.month
+    year, month = (int(x) for x in value.split("-"))
+    if not 1 <= month <= 12 or not MIN_YEAR <= year <= MAX_YEAR:
+        raise ValueError("Invalid month")
+    return year, month
+
+
+def shift_month(year, month, offset):
+    index = year * 12 + month - 1 + offset
+    return index // 12, index % 12 + 1
+
+
+def feed_months():
+    year, month = parse_month(None)
+    return [shift_month(year, month, x) for x in FEED_MONTHS]
+
+
+def feed_token(user):
+    return signing.dumps(user.pk, salt=FEED_SALT)
+
+
+def load_feed_token(token):
+    return signing.loads(token, salt=FEED_SALT)
+
+
+def get_etag(user_id, year, month):
+    versions = caching.get_versions(GLOBAL_VERSION, models.agenda_version(user_id))
+    return caching.make_etag("agenda", user_id, year, month, *versions)
+
+
+def get_agenda(user_id, year, month):
+    key = f"agenda:{user_id}:{year}-{month:02}:{get_etag(user_id, year, month)}"
+    items = cache.get(key)
+    if items is None:
+        with db.reading_from(db.PRIMARY):
+            items = build_agenda(user_id, year, month)
+        cache.set(key, items, CACHE_TIMEOUT)
+    return items
+
+
+def _item(type, id, title, start, end, all_day=False, organization=None, location=""):
+    return dict(
+        type=type,
+        id=id,
+        title=title,
+        start=start.isoformat(),
+        end=end.isoformat(),
+        all_day=all_day,
+        organization=organization,
+        location=location,
+    )
+
+
+def _local(value):
+    return timezone.localtime(value) if timezone.is_aware(value) else value
+
+
+def build_agenda(user_id, year, month):
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    month_start = timezone.make_aware(datetime.combine(first, time.min))
+    month_end = timezone.make_aware(datetime.combine(last + timedelta(days=1), time.min))
+    days = [first + timedelta(days=x) for x in range((last - first).days + 1)]
+
+    schedules = list(models.Schedule.objects.filter(start__lte=last, end__gte=first))
+    school_days = {}
+    for day in days:
+        for schedule in schedules:
+            if schedule.start <= day <= schedule.end and day.weekday() in schedule.weekday:
+                school_days[day] = schedule
+                break
+
+    items = [
+        _item("schedule", schedule.id, schedule.name, day, day, all_day=True) for day, schedule in school_days.items()
+    ]
+
+    schedule_periods = {
+        (x.schedule_id, x.period_id): x
+        for x in models.SchedulePeriod.objects.filter(schedule__in={x.id for x in school_days.values()})
+    }
+    slots = models.MeetingSlot.objects.filter(
+        organization__memberships__user_id=user_id,
+        organization__memberships__active=True,
+        organization__memberships__calendar_events=True,
+    ).select_related("organization")
+    for slot in slots:
+        org = slot.organization
+        for day, schedule in school_days.items():
+            if day.weekday() != slot.day:
+                continue
+            start, end = slot.start_time, slot.end_time
+            if start is None and (period := schedule_periods.get((schedule.id, slot.period_id))):
+                start, end = period.start, period.end
+            if start is None:
+                start, end, all_day = day, day, True
+            else:
+                start = timezone.make_aware(datetime.combine(day, start))
+                end = timezone.make_aware(datetime.combine(day, end)) if end else start + MEETING_LENGTH
+                all_day = False
+            items.append(_item("meeting", org.id, org.name, start, end, all_day, org.id, org.location))
+
+    events = models.Event.objects.filter(
+        organization__memberships__user_id=user_id,
+        organization__memberships__active=True,
+        start__lt=month_end,
+        end__gte=month_start,
+    ).select_related("organization")
+    items.extend(
+        _item("event", e.id, e.name, _local(e.start), _local(e.end), organization=e.organization_id) for e in events
+    )
+
+    calendar_events = models.CalendarEvent.objects.filter(user_id=user_id, start__lt=month_end, end__gte=month_start)
+    items.extend(
+        _item("calendar_event", e.id, e.title, _local(e.start), _local(e.end), all_day=e.all_day)
+        for e in calendar_events
+    )
+
+    items.sort(key=lambda x: (x["start"], x["type"], x["id"]))
+    return items
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold(line):
+    parts = []
+    while len(line) > 75:
+        parts.append(line[:75])
+        line = " " + line[75:]
+    parts.append(line)
+    return "\r\n".join(parts)
+
+
+def _ical_time(name, value, all_day):
+    if all_day:
+        day = date.fromisoformat(value[:10])
+        if name == "DTEND":
+            day += timedelta(days=1)
+        return f"{name};VALUE=DATE:{day:%Y%m%d}"
+    moment = datetime.fromisoformat(value).astimezone(timezone.utc)
+    return f"{name}:{moment:%Y%m%dT%H%M%SZ}"
+
+
+def to_ical(items):
+    stamp = f"{timezone.now().astimezone(timezone.utc):%Y%m%dT%H%M%SZ}"
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Lynbrook ASB//Lynbrook App//EN",
+        "CALSCALE:GREGORIAN",
+        "X-WR-CALNAME:Lynbrook",
+    ]
+    for item in items:
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{item['type']}-{item['id']}-{item['start'][:10]}@lynbrookasb.org",
+            f"DTSTAMP:{stamp}",
+            _ical_time("DTSTART", item["start"], item["all_day"]),
+            _ical_time("DTEND", item["end"], item["all_day"]),
+            f"SUMMARY:{_escape(item['title'])}",
+        ]
+        if item["location"]:
+            lines.append(f"LOCATION:{_escape(item['location'])}")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(x) for x in lines) + "\r\n"
@@ -0,0 +1,144 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from core import caching, catalog, db, serializers, views
+
+# Async versions of the hottest read endpoints, served by the ASGI URLconf in lynbrook_app/asgi_urls.py.
+# The ORM and cache have no async API yet, so each request does its sync work in one run_sync call.
+
+organization_list = views.OrganizationViewSet.as_view({"get": "list"})
+event_list = views.EventViewSet.as_view({"get": "list"})
+
+
+def run_sync(func, *args):
+    # Thread-sensitive calls would all share one thread, so each runs in the executor instead and manages
+    # its own connection the way Django does around a sync request
+    def run():
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+def json_response(data=None, status=status.HTTP_200_OK, etag=None):
+    response = HttpResponse(
+        b"" if data is None else JSONRenderer().render(data), status=status, content_type="application/json"
+    )
+    if etag is not None:
+        response["ETag"] = etag
+    return response
+
+
+def error_response(request, exc):
+    # The response APIView.handle_exception gives, so clients see the same codes and headers on both routes
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        header = request.authenticators[0].authenticate_header(request)
+        if header:
+            exc.auth_header = header
+        else:
+            exc.status_code = status.HTTP_403_FORBIDDEN
+    response = api_settings.EXCEPTION_HANDLER(exc, {"request": request})
+    error = json_response(response.data, response.status_code)
+    for key, value in response.items():
+        if key != "Content-Type":
+            error[key] = value
+    return error
+
+
+def load_request(request):
+    request = Request(request, authenticators=[x() for x in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        if not request.user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+    except exceptions.APIException as exc:
+        return request, False, error_response(request, exc)
+    return request, db.is_pinned(request.user), None
+
+
+def endpoint(authenticated=True):
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return json_response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+            response = await respond(request, *args, **kwargs)
+            if request.method == "HEAD":
+                # Django leaves this to the server, which ASGI servers don't do
+                response["Content-Length"] = len(response.content)
+                response.content = b""
+            return response
+
+        async def respond(request, *args, **kwargs):
+            if not authenticated:
+                return await view(request, *args, **kwargs)
+
+            request, pinned, error = await run_sync(load_request, request)
+            if error is not None:
+                return error
+            # Same routing as db.ReplicaReadMixin; sync_to_async copies the context into the executor
+            with db.reading_from(db.REPLICA if db.has_replica() and not pinned else None):
+                return await view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@endpoint(authenticated=False)
+async def app_version(request):
+    return json_response(views.APP_VERSION)
+
+
+@endpoint()
+async def current_schedule(request):
+    return json_response(await run_sync(views.week_schedule, request, views.week_start(2)))
+
+
+@endpoint()
+async def next_schedule(request):
+    return json_response(await run_sync(views.week_schedule, request, views.week_start(9)))
+
+
+def render(view, request):
+    # DRF responses render lazily, which must also happen in the executor
+    return view(request).render()
+
+
+def load_events(request):
+    qs = views.active_events(request.user)
+    return serializers.EventSerializer(qs, many=True, context={"request": request}).data
+
+
+@endpoint()
+async def events(request):
+    # Filtered and paginated lists go through the regular view
+    if request.query_params:
+        return await run_sync(render, event_list, request._request)
+    return json_response(await run_sync(load_events, request))
+
+
+def load_catalog(request):
+    etag = catalog.get_etag()
+    if caching.etag_matches(request, etag):
+        return None, etag
+    return catalog.get_catalog(request, etag), etag
+
+
+@endpoint()
+async def organizations(request):
+    if request.query_params:
+        return await run_sync(render, organization_list, request._request)
+    data, etag = await run_sync(load_catalog, request)
+    if data is None:
+        return json_response(status=status.HTTP_304_NOT_MODIFIED, etag=etag)
+    return json_response(data, etag=etag)
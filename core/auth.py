@@ -1,13 +1,71 @@
-from requests import ConnectionError, request
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+from django.core.cache import cache
+from requests import ConnectionError, Session
+from requests.adapters import HTTPAdapter
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
 from social_core.backends.google import GoogleOAuth2
 from social_core.backends.oauth import BaseOAuth1
 from social_core.exceptions import AuthFailed
 from social_core.utils import SSLHttpAdapter, user_agent
+from urllib3.util.retry import Retry
 
-from core.models import UserType
+from core import caching, db
+from core.models import UserType, user_version
 
 API_BASE_URL = "https://api.schoology.com/v1"
 SCHOOLOGY_URL = "https://fuhsd.schoology.com"
+USER_CACHE_TIMEOUT = 60
+
+# Retries failed connections, and gateway errors on idempotent requests
+SCHOOLOGY_RETRY = Retry(total=3, backoff_factor=0.2, status_forcelist=(502, 503, 504), raise_on_status=False)
+SCHOOLOGY_POOL_SIZE = 10
+
+_sessions = {}
+# The sessions are shared by every user's login, so they must not carry one user's cookies into another's requests
+NO_COOKIES = DefaultCookiePolicy(allowed_domains=[])
+_sessions_lock = threading.Lock()
+
+
+def get_session(ssl_protocol=None):
+    # One keep-alive session per process (and SSL protocol), so logins reuse open connections to Schoology
+    try:
+        return _sessions[ssl_protocol]
+    except KeyError:
+        pass
+    with _sessions_lock:
+        if ssl_protocol not in _sessions:
+            if ssl_protocol:
+                adapter = SSLHttpAdapter(ssl_protocol)
+                adapter.max_retries = SCHOOLOGY_RETRY
+            else:
+                adapter = HTTPAdapter(
+                    pool_connections=SCHOOLOGY_POOL_SIZE, pool_maxsize=SCHOOLOGY_POOL_SIZE, max_retries=SCHOOLOGY_RETRY
+                )
+            session = Session()
+            session.cookies.set_policy(NO_COOKIES)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[ssl_protocol] = session
+        return _sessions[ssl_protocol]
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        # The version changes whenever the user is saved, so a stale row is never served
+        key = f"auth:user:{user_id}:{caching.get_versions(user_version(user_id))[0]}"
+        user = cache.get(key)
+        if user is None:
+            with db.reading_from(db.PRIMARY):
+                user = super().get_user(validated_token)
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user
 
 
 class GoogleOAuth(GoogleOAuth2):
@@ -64,14 +122,11 @@ class SchoologyOAuth(BaseOAuth1):
         if self.SEND_USER_AGENT and "User-Agent" not in kwargs["headers"]:
             kwargs["headers"]["User-Agent"] = self.setting("USER_AGENT") or user_agent()
 
+        session = get_session(self.SSL_PROTOCOL)
         try:
             response = None
             while response is None or response.status_code == 303:
-                if self.SSL_PROTOCOL:
-                    session = SSLHttpAdapter.ssl_adapter_session(self.SSL_PROTOCOL)
-                    response = session.request(method, url, *args, **kwargs, allow_redirects=False)
-                else:
-                    response = request(method, url, *args, **kwargs, allow_redirects=False)
+                response = session.request(method, url, *args, **kwargs, allow_redirects=False)
                 if response.status_code == 303:
                     url = response.headers["Location"]
         except ConnectionError as err:
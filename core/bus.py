@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import select
+import threading
+import time
+
+import psycopg2
+from django.conf import settings
+from django.db import connection, connections
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "core_invalidate"
+# Postgres rejects notification payloads of 8000 bytes or more
+MAX_PAYLOAD = 7000
+POLL_SECONDS = 5
+RETRY_SECONDS = 5
+
+handlers = []
+_lock = threading.Lock()
+_listener_pid = None
+
+
+def subscribe(handler):
+    # Handlers get a list of keys, or None when notifications may have been missed
+    handlers.append(handler)
+
+
+def notify(keys):
+    # Callers send this once their changes are committed, see caching.bump_versions
+    with connection.cursor() as cursor:
+        for payload in payloads(keys):
+            cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, payload])
+
+
+def payloads(keys):
+    batch, size = [], 2
+    for key in keys:
+        if batch and size + len(key) + 4 > MAX_PAYLOAD:
+            yield json.dumps(batch)
+            batch, size = [], 2
+        batch.append(key)
+        size += len(key) + 4
+    if batch:
+        yield json.dumps(batch)
+
+
+def dispatch(keys):
+    for handler in handlers:
+        handler(keys)
+
+
+def ensure_listening():
+    # Started lazily and per pid, since forked workers do not inherit the parent's threads
+    global _listener_pid
+    if _listener_pid == os.getpid() or not settings.INVALIDATION_LISTEN:
+        return
+    with _lock:
+        if _listener_pid != os.getpid():
+            threading.Thread(target=listen, name="core-invalidate", daemon=True).start()
+            _listener_pid = os.getpid()
+
+
+def listen_params():
+    # LISTEN needs a session of its own, which pgbouncer's transaction pooling can't provide
+    params = connections["default"].get_connection_params()
+    params.update(host=settings.INVALIDATION_LISTEN_HOST, port=settings.INVALIDATION_LISTEN_PORT)
+    return params
+
+
+def listen():
+    reconnecting = False
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(**listen_params())
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            if reconnecting:
+                # Anything sent while disconnected was missed
+                dispatch(None)
+            while True:
+                if select.select([conn], [], [], POLL_SECONDS) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    dispatch(json.loads(conn.notifies.pop(0).payload))
+        except Exception as e:
+            logger.error("invalidation listener failed: %s", e)
+            reconnecting = True
+        finally:
+            if conn is not None:
+                conn.close()
+        time.sleep(RETRY_SECONDS)
@@ -0,0 +1,89 @@
+import hashlib
+import time
+from collections import defaultdict
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from core import bus
+
+# Versions are kept in process for this long at most, in case the listener misses an eviction
+LOCAL_VERSION_TIMEOUT = 5 * 60
+
+# Model -> versions bumped whenever an instance is saved or deleted, see register
+registry = defaultdict(list)
+
+
+def version_key(name):
+    return f"version:{name}"
+
+
+def local_caches():
+    # The shared cache is also process local when no cache server is configured
+    return [x for x in (caches["local"], caches["default"]) if isinstance(x, LocMemCache)]
+
+
+def evict_versions(keys):
+    for backend in local_caches():
+        if keys is None:
+            backend.clear()
+        else:
+            backend.delete_many(keys)
+
+
+bus.subscribe(evict_versions)
+
+
+def get_versions(*names):
+    bus.ensure_listening()
+    keys = [version_key(name) for name in names]
+    versions = caches["local"].get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        shared = cache.get_many(missing)
+        new = {key: time.time_ns() for key in missing if key not in shared}
+        if new:
+            cache.set_many(new, None)
+            shared.update(new)
+        caches["local"].set_many(shared, LOCAL_VERSION_TIMEOUT)
+        versions.update(shared)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*names):
+    # Deferred until commit, so no process can cache data from before the change under the new version, and a
+    # rolled back transaction invalidates nothing
+    if names:
+        transaction.on_commit(lambda: apply_versions(names))
+
+
+def apply_versions(names):
+    now = time.time_ns()
+    versions = {version_key(name): now for name in names}
+    cache.set_many(versions, None)
+    caches["local"].set_many(versions, LOCAL_VERSION_TIMEOUT)
+    bus.notify(list(versions))
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(":".join(str(x) for x in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request, etag):
+    header = request.META.get("HTTP_IF_NONE_MATCH", "")
+    return etag in (x.strip() for x in header.split(","))
+
+
+def register(model, *versions):
+    # Versions are names, or functions of the saved instance for per-object versions
+    if model not in registry:
+        post_save.connect(invalidate_registered, sender=model, dispatch_uid=f"caching:save:{model._meta.label}")
+        post_delete.connect(invalidate_registered, sender=model, dispatch_uid=f"caching:delete:{model._meta.label}")
+    registry[model].extend(versions)
+
+
+def invalidate_registered(*, sender, instance, **kwargs):
+    bump_versions(*{x(instance) if callable(x) else x for x in registry[sender]})
@@ -0,0 +1,25 @@
+from django.core.cache import cache
+
+from core import caching, db, models, serializers
+
+VERSION = "catalog"
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def get_queryset():
+    return models.Organization.objects.prefetch_related("advisors", "admins", "links", "meeting_slots")
+
+
+def get_etag():
+    return caching.make_etag("catalog", *caching.get_versions(VERSION))
+
+
+def get_catalog(request, etag):
+    # Organization URLs are absolute, so each host gets its own copy
+    key = f"catalog:{request.build_absolute_uri('/')}:{etag}"
+    data = cache.get(key)
+    if data is None:
+        with db.reading_from(db.PRIMARY):
+            data = serializers.OrganizationSerializer(get_queryset(), many=True, context={"request": request}).data
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
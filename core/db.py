@@ -0,0 +1,106 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA = "replica"
+# Caches stamped with a version rebuild from the primary. Right after a bump, a lagging replica would
+# otherwise have its old rows cached under the new version.
+PRIMARY = "default"
+# Long enough to cover replication lag, so users read their own writes back from the primary
+PIN_SECONDS = 10
+
+_read_alias = ContextVar("read_alias", default=None)
+
+
+def has_replica():
+    return REPLICA in settings.DATABASES
+
+
+def pin_key(user_id):
+    return f"db:pin:{user_id}"
+
+
+def pin_to_primary(user):
+    if user.is_authenticated:
+        cache.set(pin_key(user.pk), True, PIN_SECONDS)
+
+
+def is_pinned(user):
+    return user.is_authenticated and cache.get(pin_key(user.pk)) is not None
+
+
+@contextmanager
+def reading_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    # Everything uses the primary unless a view opted in with ReplicaReadMixin
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == "django_cache":
+            # A database cache holds the pins, which must not lag behind
+            return None
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+class ReplicaReadMixin:
+    def dispatch(self, request, *args, **kwargs):
+        if not has_replica() or request.method not in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with reading_from(REPLICA):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Authentication has run now, so the user is known
+        if _read_alias.get() == REPLICA and is_pinned(request.user):
+            _read_alias.set(None)
+
+
+class PinWritesMiddleware:
+    # Async-capable so reads served by the async views don't hop to a sync thread
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Marks the instance as a coroutine function, as Django's MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.should_pin(request, response):
+            pin_to_primary(request.user)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.should_pin(request, response):
+            await sync_to_async(pin_to_primary)(request.user)
+        return response
+
+    def should_pin(self, request, response):
+        # DRF sets the authenticated user back onto the Django request
+        return has_replica() and request.method not in SAFE_METHODS and response.status_code < 400
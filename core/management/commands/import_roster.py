@@ -0,0 +1,228 @@
+import csv
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from core import caching
+from core.matching import NameMatcher, normalize
+from core.models import (
+    CATALOG_USER_FIELDS,
+    ClubCategory,
+    DayOfWeek,
+    Membership,
+    Organization,
+    OrganizationType,
+    UserType,
+    profile_version,
+    user_version,
+)
+
+CLUB_FIELDS = ("location", "day", "time")
+USER_FIELDS = ("first_name", "last_name", "grad_year", "type")
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return list(csv.DictReader(f))
+
+
+def parse_club(row):
+    location = row.get("Location", "").strip()
+    if location.isdigit():
+        location = f"Room {int(location):03}"
+    day = row.get("Day", "").strip()
+    if day and day.upper() not in DayOfWeek.__members__:
+        raise CommandError(f"Invalid day {day!r} for {row['Club Name'].strip()}")
+    return dict(
+        location=location,
+        day=DayOfWeek[day.upper()] if day else None,
+        time=row.get("Time", "").strip(),
+    )
+
+
+def normalize_club(name):
+    text = normalize(name)
+    if not text:
+        raise CommandError(f"Club name {name!r} has no words to match existing clubs by")
+    return text
+
+
+def parse_user(row):
+    grad_year = row.get("Grad Year", "").strip()
+    return dict(
+        first_name=row["First Name"].strip(),
+        last_name=row["Last Name"].strip(),
+        grad_year=int(grad_year) if grad_year else None,
+        type=UserType.STUDENT if grad_year else UserType.STAFF,
+    )
+
+
+class Command(BaseCommand):
+    help = "Imports clubs, users and club memberships from CSV files, applying only what changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clubs", help="CSV with Club Name, Location, Day and Time columns")
+        parser.add_argument("--users", help="CSV with Email, First Name, Last Name and Grad Year columns")
+        parser.add_argument("--memberships", help="CSV with Email and Club Name columns")
+        parser.add_argument(
+            "--club-map",
+            help="CSV with Club Name and Existing Club columns, accepting suggested matches for names in the imports",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report the changes without saving them")
+
+    def handle(self, *args, **options):
+        if not any(options[x] for x in ("clubs", "users", "memberships")):
+            raise CommandError("Nothing to import. Pass --clubs, --users and/or --memberships.")
+
+        self.club_map = {}
+        if options["club_map"]:
+            for row in read_csv(options["club_map"]):
+                self.club_map[normalize_club(row["Club Name"])] = row["Existing Club"].strip()
+
+        # Dry runs apply everything and roll back, so later files see rows created by earlier ones
+        with transaction.atomic():
+            if options["clubs"]:
+                self.import_clubs(read_csv(options["clubs"]))
+            if options["users"]:
+                self.import_users(read_csv(options["users"]))
+            if options["memberships"]:
+                self.import_memberships(read_csv(options["memberships"]))
+
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+                self.stdout.write(self.style.WARNING("Dry run, no changes were saved."))
+
+    def report(self, label, items):
+        items = list(items)
+        self.stdout.write(f"{label}: {len(items)}")
+        for item in items:
+            self.stdout.write(f"  {item}")
+
+    def match_club(self, matcher, name, suggestions, ambiguous):
+        # Only exact and normalized matches apply on their own. "Robotics Team B" is close to "Robotics Team A"
+        # but is a different club, so approximate matches are suggested and must be accepted with --club-map.
+        # Names matching several clubs are added to ambiguous, and also need --club-map.
+        mapped = self.club_map.get(normalize_club(name))
+        if mapped:
+            matches = matcher.named(mapped) or [x for x in matcher.match(mapped) if x.score == 1]
+            if len(matches) != 1:
+                raise CommandError(f"{mapped!r} in the club map does not name exactly one existing club")
+            return matches[0]
+
+        matches = matcher.match(name, threshold=0.6)
+        exact = [x for x in matches if x.score == 1]
+        if len(exact) > 1:
+            exact = matcher.named(name) or exact
+        if len(exact) == 1:
+            return exact[0]
+        if exact:
+            ambiguous[name] = f"{name} -> {', '.join(sorted(x.name for x in exact))}"
+        elif (match := matcher.best(name)) is not None:
+            suggestions.add(f"{name} -> {match.name} ({match.score})")
+        return None
+
+    def import_clubs(self, rows):
+        matcher = NameMatcher((x, x.name) for x in Organization.objects.filter(type=OrganizationType.CLUB))
+        new_clubs = {}
+        created, updated, suggestions, ambiguous = [], [], set(), {}
+
+        for row in rows:
+            name = " ".join(row["Club Name"].split())
+            values = parse_club(row)
+            match = self.match_club(matcher, name, suggestions, ambiguous)
+            if name in ambiguous:
+                continue
+            club = match.key if match else new_clubs.get(normalize(name))
+            if club is None:
+                club = Organization(name=name, type=OrganizationType.CLUB, category=ClubCategory.INTEREST, **values)
+                new_clubs[normalize(name)] = club
+                created.append(club)
+            elif any(getattr(club, k) != v for k, v in values.items()):
+                for k, v in values.items():
+                    setattr(club, k, v)
+                updated.append(club)
+
+        Organization.objects.bulk_create(created)
+        Organization.objects.bulk_update(updated, CLUB_FIELDS, batch_size=500)
+        Organization.bulk_sync_meeting_slots([*created, *updated])
+        if created or updated:
+            caching.bump_versions("catalog", "agenda", "profile:organizations")
+
+        self.report("Clubs created", created)
+        self.report("Clubs updated", updated)
+        self.report("Clubs created despite a similar existing club (accept with --club-map)", sorted(suggestions))
+        self.report(
+            "Clubs skipped, matching several existing clubs (pick one with --club-map)", sorted(ambiguous.values())
+        )
+
+    def import_users(self, rows):
+        User = get_user_model()
+        emails = [x["Email"].strip().lower() for x in rows]
+        users = {x.email.lower(): x for x in User.objects.only("id", "email", *USER_FIELDS)}
+        created, updated, moved, renamed = [], [], [], []
+
+        for email, row in zip(emails, rows):
+            values = parse_user(row)
+            user = users.get(email)
+            if user is None:
+                user = User(email=email, **values)
+                user.set_unusable_password()
+                users[email] = user
+                created.append(user)
+            elif any(getattr(user, k) != v for k, v in values.items()):
+                if user.grad_year != values["grad_year"]:
+                    moved.append(user)
+                if any(getattr(user, k) != values[k] for k in CATALOG_USER_FIELDS.intersection(values)):
+                    renamed.append(user)
+                for k, v in values.items():
+                    setattr(user, k, v)
+                updated.append(user)
+
+        User.objects.bulk_create(created, batch_size=1000)
+        User.objects.bulk_update(updated, USER_FIELDS, batch_size=1000)
+        caching.bump_versions(*(user_version(x.id) for x in updated), *(profile_version(x.id) for x in updated))
+        # Mirrors the invalidate_catalog_user signal, which bulk_update skips
+        if renamed and Organization.objects.filter(Q(advisors__in=renamed) | Q(admins__in=renamed)).exists():
+            caching.bump_versions("catalog")
+
+        # Mirrors the add_required_orgs signal for the rows that skipped it
+        changed = [*created, *moved]
+        if moved:
+            Membership.deactivate(
+                Membership.objects.filter(user__in=moved, organization__required_grad_year__isnull=False)
+            )
+        required = list(Organization.objects.filter(Q(required=True) | Q(required_grad_year__isnull=False)))
+        Membership.activate(
+            (user.id, org.id)
+            for user in changed
+            for org in required
+            if org.required or (user.grad_year is not None and org.required_grad_year == user.grad_year)
+        )
+
+        self.report("Users created", (x.email for x in created))
+        self.report("Users updated", (x.email for x in updated))
+
+    def import_memberships(self, rows):
+        User = get_user_model()
+        users = {email.lower(): id for id, email in User.objects.values_list("id", "email")}
+        matcher = NameMatcher(Organization.objects.filter(type=OrganizationType.CLUB).values_list("id", "name"))
+        pairs, labels, unknown, suggestions, ambiguous = set(), {}, [], set(), {}
+
+        for row in rows:
+            email = row["Email"].strip().lower()
+            match = self.match_club(matcher, " ".join(row["Club Name"].split()), suggestions, ambiguous)
+            if email not in users or match is None:
+                unknown.append(f"{row['Email']} / {row['Club Name']}")
+                continue
+            pair = (users[email], match.key)
+            pairs.add(pair)
+            labels[pair] = f"{email} / {match.name}"
+
+        activated = Membership.activate(pairs)
+
+        self.report("Memberships activated", sorted(labels[x] for x in activated))
+        self.report("Memberships skipped (unknown user or club)", unknown)
+        self.report("Suggested club matches (accept with --club-map)", sorted(suggestions))
+        self.report("Clubs matching several existing clubs (pick one with --club-map)", sorted(ambiguous.values()))
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Profiles Django setup and URLconf imports in a fresh interpreter and lists the slowest modules."
+
+    def add_arguments(self, parser):
+        parser.add_argument("modules", nargs="*", help="Modules to import after setup (default: the URLconf)")
+        parser.add_argument("--limit", type=int, default=25, help="Number of modules to list")
+
+    def handle(self, *args, **options):
+        modules = options["modules"] or [settings.ROOT_URLCONF]
+        code = "import django; django.setup(); " + "; ".join(f"import {x}" for x in modules)
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+
+        # Lines look like "import time:       self [us] |  cumulative | imported package"
+        rows = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            own, cumulative, name = line[len("import time:") :].split("|")
+            rows.append((int(cumulative), int(own), name.rstrip()))
+
+        total = sum(own for _, own, _ in rows)
+        self.stdout.write(f"{len(rows)} modules imported in {total / 1000:.0f} ms")
+        self.stdout.write(f"{'cumulative':>12} {'self':>10}  module")
+        for cumulative, own, name in sorted(rows, reverse=True)[: options["limit"]]:
+            self.stdout.write(f"{cumulative / 1000:>9.1f} ms {own / 1000:>7.1f} ms {name}")
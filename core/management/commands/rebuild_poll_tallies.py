@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import PollTally
+
+
+class Command(BaseCommand):
+    help = "Recounts every select poll's result tallies from its submissions."
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        PollTally.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {PollTally.objects.count()} poll tallies."))
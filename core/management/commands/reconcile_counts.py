@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Event, Organization
+
+
+class Command(BaseCommand):
+    help = "Recounts the denormalized event submission and organization member counts."
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        events = Event.refresh_submission_counts()
+        organizations = Organization.refresh_member_counts()
+        self.stdout.write(self.style.SUCCESS(f"Recounted {events} events and {organizations} organizations."))
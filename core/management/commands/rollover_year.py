@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core import caching
+from core.models import Membership, Organization, OrganizationType
+
+YEARS_OF_SCHOOL = 4
+
+
+class Command(BaseCommand):
+    help = "Rolls the school year over: creates the incoming class, enrolls it, and retires the graduated class."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--graduating", type=int, help="Grad year of the class that just graduated (default: this year)"
+        )
+        parser.add_argument("--incoming", type=int, help="Grad year of the incoming class (default: graduating + 4)")
+        parser.add_argument("--preview", action="store_true", help="Report the changes without saving them")
+
+    def handle(self, *args, **options):
+        graduating = options["graduating"] or timezone.localdate().year
+        incoming = options["incoming"] or graduating + YEARS_OF_SCHOOL
+
+        with transaction.atomic():
+            self.rollover(graduating, incoming)
+            if options["preview"]:
+                transaction.set_rollback(True)
+                self.stdout.write(self.style.WARNING("Preview, no changes were saved."))
+
+    def rollover(self, graduating, incoming):
+        org = Organization.objects.filter(type=OrganizationType.CLASS, required_grad_year=incoming).first()
+        if org is None:
+            # bulk_create skips add_required_users, which would enroll the class through the per-row signals
+            (org,) = Organization.objects.bulk_create(
+                [Organization(type=OrganizationType.CLASS, name=f"Class of {incoming}", required_grad_year=incoming)]
+            )
+            caching.bump_versions("catalog", "agenda", "profile:organizations")
+            self.stdout.write(f"Created {org.name}")
+        else:
+            self.stdout.write(f"{org.name} already exists")
+
+        users = get_user_model().objects.filter(grad_year=incoming, is_active=True).values_list("id", flat=True)
+        enrolled = Membership.activate((user_id, org.id) for user_id in users)
+        self.stdout.write(f"Enrolled {len(enrolled)} users in {org.name}")
+
+        retired = Membership.deactivate(Membership.objects.filter(user__grad_year__lte=graduating))
+        users = {user_id for user_id, _ in retired}
+        self.stdout.write(
+            f"Deactivated {len(retired)} memberships of {len(users)} users graduating in {graduating} or earlier"
+        )
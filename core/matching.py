@@ -0,0 +1,80 @@
+import re
+from collections import defaultdict, namedtuple
+
+Match = namedtuple("Match", ("key", "name", "score"))
+
+# Words that appear in many club names, or are left off of them, and say nothing about which club is meant
+STOPWORDS = {"lynbrook", "club", "the", "of", "and", "a", "lhs"}
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(name):
+    return [x for x in WORD_RE.findall(name.casefold().replace("&", " and ")) if x not in STOPWORDS]
+
+
+def normalize(name):
+    return " ".join(tokenize(name))
+
+
+def ngrams(text, n=3):
+    text = f" {text} "
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+class NameMatcher:
+    def __init__(self, items):
+        # items are (key, name) pairs, e.g. organization ids and names
+        self.items = []
+        self.exact = defaultdict(list)
+        self.index = defaultdict(set)
+        for key, name in items:
+            text = normalize(name)
+            i = len(self.items)
+            self.items.append((key, name, text, ngrams(text), set(text.split())))
+            self.exact[text].append(i)
+            for gram in self.items[i][3]:
+                self.index[gram].add(i)
+
+    def match(self, name, limit=5, threshold=0.3):
+        text = normalize(name)
+        if not text:
+            return []
+        if text in self.exact:
+            return [Match(self.items[i][0], self.items[i][1], 1.0) for i in self.exact[text]][:limit]
+
+        grams, tokens = ngrams(text), set(text.split())
+        shared = defaultdict(int)
+        for gram in grams:
+            for i in self.index.get(gram, ()):
+                shared[i] += 1
+
+        matches = []
+        for i, count in shared.items():
+            key, original, _, item_grams, item_tokens = self.items[i]
+            # Dice coefficient over trigrams, blended with the share of whole words in common
+            gram_score = 2 * count / (len(grams) + len(item_grams))
+            token_score = len(tokens & item_tokens) / max(len(tokens), len(item_tokens))
+            score = 0.7 * gram_score + 0.3 * token_score
+            if score >= threshold:
+                matches.append(Match(key, original, round(score, 3)))
+
+        matches.sort(key=lambda x: (-x.score, x.name))
+        return matches[:limit]
+
+    def named(self, name):
+        # Items with exactly this name, which tells apart names that normalize alike
+        name = " ".join(name.split()).casefold()
+        return [
+            Match(key, original, 1.0)
+            for key, original, *_ in self.items
+            if " ".join(original.split()).casefold() == name
+        ]
+
+    def best(self, name, threshold=0.6, margin=0.1):
+        # Returns None rather than guess between two similarly good candidates
+        matches = self.match(name, limit=2, threshold=threshold)
+        if not matches:
+            return None
+        if len(matches) > 1 and matches[0].score - matches[1].score < margin:
+            return None
+        return matches[0]
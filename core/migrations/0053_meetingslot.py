@@ -0,0 +1,163 @@
+import re
+from collections import namedtuple
+from datetime import time
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A copy of core.meetings as of this migration, so later changes to the parser don't change the backfill
+
+Slot = namedtuple("Slot", ("day", "period_id", "start_time", "end_time"))
+
+WEEKDAYS = {
+    "mon": 0,
+    "tue": 1,
+    "wed": 2,
+    "thu": 3,
+    "fri": 4,
+    "sat": 5,
+    "sun": 6,
+}
+
+WEEKDAY_RE = re.compile(
+    r"\b(mon(?:day)?|tues?(?:day)?|wed(?:nesday)?|thu(?:rs?)?(?:day)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)s?\b", re.I
+)
+TIME = r"(\d{1,2})(?::(\d{2}))?\s*([ap])?\.?m?\.?"
+TIME_RANGE_RE = re.compile(rf"\b{TIME}(?:\s*(?:-|–|to)\s*{TIME})?", re.I)
+
+
+def _to_time(hour, minute, meridiem):
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        if meridiem.lower() == "p" and hour != 12:
+            hour += 12
+        elif meridiem.lower() == "a" and hour == 12:
+            hour = 0
+    elif 1 <= hour <= 6:
+        # Without AM/PM, an early hour is an after school meeting
+        hour += 12
+    if hour > 23 or minute > 59:
+        return None
+    return time(hour, minute)
+
+
+def _is_time(match):
+    # A bare number like "3" could as well be a room or a period
+    h1, m1, p1, h2, m2, p2 = match.groups()
+    return m1 is not None or p1 is not None or h2 is not None
+
+
+def parse_times(text):
+    for match in TIME_RANGE_RE.finditer(text):
+        if not _is_time(match):
+            continue
+        h1, m1, p1, h2, m2, p2 = match.groups()
+        end = _to_time(h2, m2, p2) if h2 is not None else None
+        start = _to_time(h1, m1, p1 or p2)
+        if p1 is None and p2 is not None and start is not None and end is not None and start > end:
+            # "11:30 - 1 PM" shares the end's meridiem only when that keeps the start before the end
+            start = _to_time(h1, m1, "a" if p2.lower() == "p" else "p")
+        if start is not None:
+            return start, end
+    return None, None
+
+
+def period_names(periods):
+    # Maps lowercased names and ids of (id, name) pairs to the ids. Numbers are left out, since a number in the
+    # text is far more often a time or a room than a period.
+    names = {name.lower(): id for id, name in periods}
+    names.update({id.lower(): id for id in names.values()})
+    return {name: id for name, id in names.items() if not name.isdigit()}
+
+
+def parse_meeting_time(text, day, periods):
+    # periods maps lowercased period names to period ids, so that "Lunch" resolves to
+    # the lunch period of whichever schedule is in effect that day.
+    text = text or ""
+    days = sorted({WEEKDAYS[x.lower()[:3]] for x in WEEKDAY_RE.findall(text)})
+    if not days:
+        if day is None:
+            return []
+        days = [day]
+
+    period_id = None
+    rest = TIME_RANGE_RE.sub(lambda x: " " if _is_time(x) else x.group(), text)
+    for name, id in sorted(periods.items(), key=lambda x: -len(x[0])):
+        if re.search(rf"\b{re.escape(name)}\b", rest, re.I):
+            period_id = id
+            break
+
+    start_time, end_time = parse_times(text)
+    return [Slot(x, period_id, start_time, end_time) for x in days]
+
+
+def backfill_meeting_slots(apps, schema_editor):
+    Organization = apps.get_model("core", "Organization")
+    MeetingSlot = apps.get_model("core", "MeetingSlot")
+    Period = apps.get_model("core", "Period")
+
+    periods = period_names(Period.objects.values_list("id", "name"))
+
+    MeetingSlot.objects.bulk_create(
+        MeetingSlot(organization=org, **slot._asdict())
+        for org in Organization.objects.all()
+        for slot in parse_meeting_time(org.time, org.day, periods)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0052_toggles_default_off"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MeetingSlot",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "day",
+                    models.IntegerField(
+                        choices=[
+                            (0, "Monday"),
+                            (1, "Tuesday"),
+                            (2, "Wednesday"),
+                            (3, "Thursday"),
+                            (4, "Friday"),
+                            (5, "Saturday"),
+                            (6, "Sunday"),
+                        ]
+                    ),
+                ),
+                ("start_time", models.TimeField(blank=True, null=True)),
+                ("end_time", models.TimeField(blank=True, null=True)),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="meeting_slots",
+                        to="core.organization",
+                    ),
+                ),
+                (
+                    "period",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="core.period",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("day", "start_time"),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="meetingslot",
+            index=models.Index(fields=["day", "start_time"], name="core_meetingslot_day_start"),
+        ),
+        migrations.RunPython(backfill_meeting_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BACKFILL_INBOX = """
+INSERT INTO core_inboxitem (user_id, post_id, date)
+SELECT m.user_id, p.id, p.date
+FROM core_post p
+JOIN core_membership m ON m.organization_id = p.organization_id AND m.active
+WHERE p.published
+ON CONFLICT DO NOTHING
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("core", "0053_meetingslot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InboxItem",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("date", models.DateTimeField()),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="inbox_items", to="core.post"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inbox_items",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("-date", "-post_id"),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="inboxitem",
+            index=models.Index(fields=["user", "-date", "-post"], name="core_inboxitem_user_date_post"),
+        ),
+        migrations.AddConstraint(
+            model_name="inboxitem",
+            constraint=models.UniqueConstraint(fields=("user", "post"), name="core_inboxitem_user_post"),
+        ),
+        migrations.RunSQL(BACKFILL_INBOX, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0054_inboxitem"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="calendarevent",
+            index=models.Index(fields=["user", "start", "id"], name="core_calendarevent_user_start"),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["start", "id"], name="core_event_start_id"),
+        ),
+        migrations.AddIndex(
+            model_name="organization",
+            index=models.Index(fields=["type", "name", "id"], name="core_organization_type_name_id"),
+        ),
+        migrations.AddIndex(
+            model_name="prize",
+            index=models.Index(fields=["points", "id"], name="core_prize_points_id"),
+        ),
+        migrations.AddIndex(
+            model_name="submission",
+            index=models.Index(fields=["user", "-created_at", "-id"], name="core_submission_user_created"),
+        ),
+    ]
@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+BACKFILL_TALLIES = """
+INSERT INTO core_polltally (poll_id, choice, count)
+SELECT s.poll_id, r.choice, count(*)
+FROM core_pollsubmission s
+JOIN core_poll p ON p.id = s.poll_id
+CROSS JOIN LATERAL unnest(s.responses) AS r(choice)
+WHERE p.type = 1
+GROUP BY s.poll_id, r.choice
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0055_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PollTally",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("choice", models.TextField()),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "poll",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="tallies", to="core.poll"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="polltally",
+            constraint=models.UniqueConstraint(fields=("poll", "choice"), name="core_polltally_poll_choice"),
+        ),
+        migrations.RunSQL(BACKFILL_TALLIES, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,77 @@
+import django.contrib.postgres.indexes
+import django_better_admin_arrayfield.models.fields
+from django.db import migrations, models
+
+REBUILD_TALLIES = """
+INSERT INTO core_polltally (poll_id, choice_index, count)
+SELECT s.poll_id, r.choice_index, count(*)
+FROM core_pollsubmission s
+CROSS JOIN LATERAL unnest(s.selected) AS r(choice_index)
+GROUP BY s.poll_id, r.choice_index
+"""
+
+
+def encode_select_responses(apps, schema_editor):
+    Poll = apps.get_model("core", "Poll")
+    PollSubmission = apps.get_model("core", "PollSubmission")
+
+    choices = dict(Poll.objects.filter(type=1).values_list("id", "choices"))
+    submissions = []
+    for submission in PollSubmission.objects.filter(poll__in=choices.keys()).iterator():
+        poll_choices = choices[submission.poll_id] or []
+        selected = [poll_choices.index(x) for x in submission.responses if x in poll_choices]
+        submission.selected = list(dict.fromkeys(selected))
+        # Keep the text of responses whose choice has since been edited away
+        if len(selected) == len(submission.responses):
+            submission.responses = []
+        submissions.append(submission)
+    PollSubmission.objects.bulk_update(submissions, ("selected", "responses"), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0056_polltally"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="pollsubmission",
+            name="responses",
+            field=django_better_admin_arrayfield.models.fields.ArrayField(
+                base_field=models.TextField(), blank=True, default=list, size=None
+            ),
+        ),
+        migrations.AddField(
+            model_name="pollsubmission",
+            name="selected",
+            field=django_better_admin_arrayfield.models.fields.ArrayField(
+                base_field=models.PositiveSmallIntegerField(), blank=True, default=list, size=None
+            ),
+        ),
+        migrations.RunPython(encode_select_responses, migrations.RunPython.noop),
+        migrations.RunSQL("DELETE FROM core_polltally", migrations.RunSQL.noop),
+        migrations.RemoveConstraint(
+            model_name="polltally",
+            name="core_polltally_poll_choice",
+        ),
+        migrations.RemoveField(
+            model_name="polltally",
+            name="choice",
+        ),
+        migrations.AddField(
+            model_name="polltally",
+            name="choice_index",
+            field=models.PositiveSmallIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddConstraint(
+            model_name="polltally",
+            constraint=models.UniqueConstraint(fields=("poll", "choice_index"), name="core_polltally_poll_choice"),
+        ),
+        migrations.RunSQL(REBUILD_TALLIES, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name="pollsubmission",
+            index=django.contrib.postgres.indexes.GinIndex(fields=["selected"], name="core_pollsubmission_selected"),
+        ),
+    ]
@@ -0,0 +1,77 @@
+import html
+import re
+
+import markdown
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+from markdown.treeprocessors import Treeprocessor
+
+# A copy of core.rendering as of this migration, so later changes to the renderer don't change the backfill
+
+EXCERPT_LENGTH = 300
+SAFE_SCHEMES = {"http", "https", "mailto", "tel"}
+SCHEME_RE = re.compile(r"^([a-z][a-z0-9+.-]*):")
+
+
+def is_safe_url(url):
+    url = re.sub(r"[\x00-\x20]", "", html.unescape(url)).lower()
+    match = SCHEME_RE.match(url)
+    return match is None or match.group(1) in SAFE_SCHEMES
+
+
+class SanitizeTreeprocessor(Treeprocessor):
+    def run(self, root):
+        for el in root.iter():
+            for attr in ("href", "src"):
+                if el.get(attr) is not None and not is_safe_url(el.get(attr)):
+                    del el.attrib[attr]
+
+
+class SanitizeExtension(markdown.Extension):
+    def extendMarkdown(self, md):
+        # Without these, raw HTML in the source is escaped instead of passed through
+        md.preprocessors.deregister("html_block")
+        md.inlinePatterns.deregister("html")
+        # Runs after the inline patterns (priority 20) have created links and images
+        md.treeprocessors.register(SanitizeTreeprocessor(md), "sanitize", 0)
+
+
+def render_markdown(text):
+    return markdown.markdown(text, extensions=[SanitizeExtension()])
+
+
+def make_excerpt(rendered, length=EXCERPT_LENGTH):
+    text = " ".join(html.unescape(strip_tags(rendered)).split())
+    return Truncator(text).chars(length)
+
+
+def render_post_content(apps, schema_editor):
+    Post = apps.get_model("core", "Post")
+
+    posts = list(Post.objects.only("id", "content"))
+    for post in posts:
+        post.content_html = render_markdown(post.content)
+        post.excerpt = make_excerpt(post.content_html)
+    Post.objects.bulk_update(posts, ["content_html", "excerpt"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0058_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="content_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="excerpt",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(render_post_content, migrations.RunPython.noop),
+    ]
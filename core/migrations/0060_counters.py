@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0059_post_content_html"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="submission_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="organization",
+            name="active_member_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE core_event e SET submission_count = (
+                SELECT count(*) FROM core_submission s WHERE s.event_id = e.id
+            );
+            UPDATE core_organization o SET active_member_count = (
+                SELECT count(*) FROM core_membership m WHERE m.organization_id = o.id AND m.active
+            );
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+# Earlier answers to the same poll are replaced by the latest one
+DELETE_DUPLICATES = """
+DELETE FROM core_pollsubmission s
+USING core_pollsubmission later
+WHERE later.poll_id = s.poll_id AND later.user_id = s.user_id AND later.id > s.id
+"""
+
+REBUILD_TALLIES = """
+DELETE FROM core_polltally;
+INSERT INTO core_polltally (poll_id, choice_index, count)
+SELECT s.poll_id, r.choice_index, count(*)
+FROM core_pollsubmission s
+CROSS JOIN LATERAL unnest(s.selected) AS r(choice_index)
+GROUP BY s.poll_id, r.choice_index
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0060_counters"),
+    ]
+
+    operations = [
+        migrations.RunSQL(DELETE_DUPLICATES, migrations.RunSQL.noop),
+        migrations.RunSQL(REBUILD_TALLIES, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name="pollsubmission",
+            constraint=models.UniqueConstraint(fields=("poll", "user"), name="core_pollsubmission_poll_user"),
+        ),
+    ]
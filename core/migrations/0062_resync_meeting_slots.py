@@ -0,0 +1,22 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# The parser copy in 0053 no longer reads bare numbers like the 3 in "3:30-4:30" as periods
+backfill_meeting_slots = import_module("core.migrations.0053_meetingslot").backfill_meeting_slots
+
+
+def resync_meeting_slots(apps, schema_editor):
+    apps.get_model("core", "MeetingSlot").objects.all().delete()
+    backfill_meeting_slots(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0061_pollsubmission_poll_user"),
+    ]
+
+    operations = [
+        migrations.RunPython(resync_meeting_slots, migrations.RunPython.noop),
+    ]
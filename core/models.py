@@ -1,4 +1,5 @@
 import random
+from collections import Counter
 from datetime import date
 
 from django.conf import settings
@@ -7,15 +8,18 @@ from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MinValueValidator
+from django.db import connection, transaction
 from django.db.models import *
 from django.db.models import F
-from django.db.models.signals import post_delete, post_save, pre_save
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils.translation import gettext as _
 from django_better_admin_arrayfield.models.fields import ArrayField
 
-from core import wordle
+from core import caching, meetings, rendering, search, wordle
 from core.notifications import send_notifications
 
 USER_MODEL = settings.AUTH_USER_MODEL
@@ -96,6 +100,22 @@ class UserManager(BaseUserManager):
         return self._create_user(email, password, **extra_fields)
 
 
+def user_version(user_id):
+    return f"user:{user_id}"
+
+
+def profile_version(user_id):
+    return f"profile:user:{user_id}"
+
+
+def agenda_version(user_id):
+    return f"agenda:user:{user_id}"
+
+
+def invalidate_member_versions(user_ids):
+    caching.bump_versions(*(agenda_version(x) for x in user_ids), *(profile_version(x) for x in user_ids))
+
+
 class User(AbstractUser):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["type"]
@@ -133,9 +153,25 @@ class ExpoPushToken(Model):
     token = CharField(max_length=200, unique=True)
 
 
-class Organization(Model):
+class CounterFieldsMixin:
+    # Counters are kept current with UPDATE queries, so saving an instance must not write back its stale copy
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                x.name for x in self._meta.concrete_fields if not x.primary_key and x.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Organization(CounterFieldsMixin, Model):
     class Meta:
         ordering = ("type", "name")
+        indexes = [
+            Index(name="core_organization_type_name_id", fields=("type", "name", "id")),
+            GinIndex(search.organization_vector(), name="core_organization_search"),
+        ]
         constraints = [
             CheckConstraint(
                 name="%(app_label)s_%(class)s_type",
@@ -180,9 +216,44 @@ class Organization(Model):
 
     ical_links = ArrayField(URLField(), blank=True, default=list)
 
+    active_member_count = PositiveIntegerField(default=0, editable=False)
+    counter_fields = ("active_member_count",)
+
+    @classmethod
+    def adjust_member_count(cls, organization_id, delta):
+        cls.objects.filter(id=organization_id).update(active_member_count=F("active_member_count") + delta)
+        caching.bump_versions("catalog")
+
+    @classmethod
+    def refresh_member_counts(cls, ids=None):
+        counts = (
+            Membership.objects.filter(organization=OuterRef("pk"), active=True)
+            .order_by()
+            .values("organization")
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        qs = cls.objects.all() if ids is None else cls.objects.filter(id__in=ids)
+        updated = qs.update(active_member_count=Coalesce(Subquery(counts), 0))
+        caching.bump_versions("catalog")
+        return updated
+
     def is_admin(self, user):
         return self.admins.filter(id=user.id).exists()
 
+    def sync_meeting_slots(self):
+        Organization.bulk_sync_meeting_slots([self])
+
+    @classmethod
+    def bulk_sync_meeting_slots(cls, organizations):
+        periods = meetings.period_names(Period.objects.values_list("id", "name"))
+        MeetingSlot.objects.filter(organization__in=organizations).delete()
+        MeetingSlot.objects.bulk_create(
+            MeetingSlot(organization=org, **slot._asdict())
+            for org in organizations
+            for slot in meetings.parse_meeting_time(org.time, org.day, periods)
+        )
+
     def is_advisor(self, user):
         return self.advisors.filter(id=user.id).exists()
 
@@ -211,9 +282,64 @@ class Membership(Model):
     calendar_events = BooleanField(default=False, help_text="Show this organization's meeting times in the user's calendar.")
     receive_pings = BooleanField(default=False, help_text="Receive push notification pings from this organization's admins.")
 
+    # Bulk counterparts to saving memberships one at a time. They skip the per-row signals, so they
+    # update the inbox, member counts and cache versions themselves.
+
+    @classmethod
+    def activate(cls, pairs):
+        pairs = set(pairs)
+        if not pairs:
+            return set()
+
+        existing = cls.objects.filter(
+            user_id__in={user_id for user_id, _ in pairs},
+            organization_id__in={organization_id for _, organization_id in pairs},
+        ).values_list("id", "user_id", "organization_id", "active")
+        existing = {(user_id, organization_id): (id, active) for id, user_id, organization_id, active in existing}
+
+        new = [x for x in pairs if x not in existing]
+        inactive = [x for x in pairs if x in existing and not existing[x][1]]
+        cls.objects.bulk_create((cls(user_id=u, organization_id=o) for u, o in new), batch_size=1000)
+        cls.objects.filter(id__in=[existing[x][0] for x in inactive]).update(active=True)
+
+        changed = {*new, *inactive}
+        for organization_id, user_ids in cls._group_by_organization(changed).items():
+            InboxItem.add_memberships(user_ids, [organization_id])
+        cls._after_bulk_change(changed)
+        return changed
 
-class Event(Model):
+    @classmethod
+    def deactivate(cls, queryset):
+        rows = list(queryset.filter(active=True).values_list("id", "user_id", "organization_id"))
+        cls.objects.filter(id__in=[id for id, _, _ in rows]).update(active=False)
+
+        changed = {(user_id, organization_id) for _, user_id, organization_id in rows}
+        for organization_id, user_ids in cls._group_by_organization(changed).items():
+            InboxItem.remove_memberships(user_ids, [organization_id])
+        cls._after_bulk_change(changed)
+        return changed
+
+    @staticmethod
+    def _group_by_organization(pairs):
+        groups = {}
+        for user_id, organization_id in pairs:
+            groups.setdefault(organization_id, []).append(user_id)
+        return groups
+
+    @staticmethod
+    def _after_bulk_change(pairs):
+        if not pairs:
+            return
+        Organization.refresh_member_counts({organization_id for _, organization_id in pairs})
+        invalidate_member_versions({user_id for user_id, _ in pairs})
+
+
+class Event(CounterFieldsMixin, Model):
     class Meta:
+        indexes = [
+            Index(name="core_event_start_id", fields=("start", "id")),
+            GinIndex(search.event_vector(), name="core_event_search"),
+        ]
         constraints = [
             CheckConstraint(
                 name="%(app_label)s_%(class)s_submission_type_code",
@@ -236,14 +362,33 @@ class Event(Model):
     code = PositiveIntegerField(null=True, blank=True)
 
     users = ManyToManyField(USER_MODEL, blank=True, through="Submission", related_name="events")
+    submission_count = PositiveIntegerField(default=0, editable=False)
+    counter_fields = ("submission_count",)
 
     def __str__(self):
         return f"{self.organization.name} • {self.name}"
 
+    @classmethod
+    def adjust_submission_count(cls, event_id, delta):
+        cls.objects.filter(id=event_id).update(submission_count=F("submission_count") + delta)
+
+    @classmethod
+    def refresh_submission_counts(cls, ids=None):
+        counts = (
+            Submission.objects.filter(event=OuterRef("pk"))
+            .order_by()
+            .values("event")
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        qs = cls.objects.all() if ids is None else cls.objects.filter(id__in=ids)
+        return qs.update(submission_count=Coalesce(Subquery(counts), 0))
+
 
 class Submission(Model):
     class Meta:
         constraints = [UniqueConstraint(name="%(app_label)s_%(class)s_user_event", fields=("user", "event"))]
+        indexes = [Index(name="core_submission_user_created", fields=("user", "-created_at", "-id"))]
 
     user = ForeignKey(User, on_delete=CASCADE, related_name="+")
     event = ForeignKey(Event, on_delete=CASCADE, related_name="submissions")
@@ -265,16 +410,67 @@ class Submission(Model):
 class Post(Model):
     class Meta:
         ordering = ("-date",)
+        indexes = [GinIndex(search.post_vector(), name="core_post_search")]
 
     organization = ForeignKey(Organization, on_delete=CASCADE, related_name="posts")
     title = CharField(max_length=200)
     date = DateTimeField(auto_now=True)
     content = TextField()
+    # Rendered from content on save
+    content_html = TextField(blank=True, editable=False)
+    excerpt = TextField(blank=True, editable=False)
     published = BooleanField(default=False)
 
     def __str__(self):
         return self.title
 
+    def render_content(self):
+        self.content_html = rendering.render_markdown(self.content)
+        self.excerpt = rendering.make_excerpt(self.content_html)
+
+    def sync_inbox(self):
+        if not self.published:
+            self.inbox_items.all().delete()
+            return
+
+        user_ids = self.organization.memberships.filter(active=True).values("user_id")
+        self.inbox_items.exclude(user_id__in=user_ids).delete()
+        self.inbox_items.update(date=self.date)
+        InboxItem.objects.bulk_create(
+            (InboxItem(user_id=x["user_id"], post=self, date=self.date) for x in user_ids),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class InboxItem(Model):
+    class Meta:
+        ordering = ("-date", "-post_id")
+        constraints = [UniqueConstraint(name="%(app_label)s_%(class)s_user_post", fields=("user", "post"))]
+        indexes = [Index(name="core_inboxitem_user_date_post", fields=("user", "-date", "-post"))]
+
+    user = ForeignKey(USER_MODEL, on_delete=CASCADE, related_name="inbox_items")
+    post = ForeignKey(Post, on_delete=CASCADE, related_name="inbox_items")
+    date = DateTimeField()
+
+    @classmethod
+    def add_memberships(cls, user_ids, organization_ids):
+        rows = Membership.objects.filter(
+            user_id__in=user_ids,
+            organization_id__in=organization_ids,
+            active=True,
+            organization__posts__published=True,
+        ).values_list("user_id", "organization__posts__id", "organization__posts__date")
+        cls.objects.bulk_create(
+            (cls(user_id=user_id, post_id=post_id, date=date) for user_id, post_id, date in rows),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    def remove_memberships(cls, user_ids, organization_ids):
+        cls.objects.filter(user_id__in=user_ids, post__organization_id__in=organization_ids).delete()
+
 
 class Poll(Model):
     class Meta:
@@ -309,16 +505,112 @@ class Poll(Model):
     def __str__(self):
         return self.description
 
+    def encode(self, responses):
+        return [self.choices.index(x) for x in responses]
+
+    def decode(self, selected):
+        return [self.choices[i] for i in selected if i < len(self.choices)]
+
+    def get_results(self):
+        counts = dict(self.tallies.values_list("choice_index", "count"))
+        return [dict(choice=choice, count=counts.get(i, 0)) for i, choice in enumerate(self.choices or ())]
+
 
 class PollSubmission(Model):
+    class Meta:
+        constraints = [UniqueConstraint(name="%(app_label)s_%(class)s_poll_user", fields=("poll", "user"))]
+        indexes = [GinIndex(name="core_pollsubmission_selected", fields=("selected",))]
+
     poll = ForeignKey(Poll, on_delete=CASCADE, related_name="submissions")
     user = ForeignKey(USER_MODEL, on_delete=CASCADE, related_name="+")
-    responses = ArrayField(TextField())
+    # Short answer polls store text; select polls store indexes into Poll.choices
+    responses = ArrayField(TextField(), blank=True, default=list)
+    selected = ArrayField(PositiveSmallIntegerField(), blank=True, default=list)
+
+    @classmethod
+    def upsert(cls, user, answers):
+        # Answering a poll again replaces the earlier submission. Tallies are applied here since the bulk
+        # queries skip the signal receivers.
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # Without this, two concurrent submits by one user could both count as new answers
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s), %s)", [cls._meta.db_table, user.pk])
+            existing = {x.poll_id: x for x in cls.objects.filter(user=user, poll__in=[x["poll"] for x in answers])}
+
+            submissions, created, updated = [], [], []
+            for answer in answers:
+                submission = existing.get(answer["poll"].id)
+                if submission is None:
+                    submission = cls(user=user, **answer)
+                    PollTally.apply(submission.poll_id, added=submission.selected)
+                    created.append(submission)
+                else:
+                    PollTally.apply(submission.poll_id, added=answer["selected"], removed=submission.selected)
+                    for key, value in answer.items():
+                        setattr(submission, key, value)
+                    updated.append(submission)
+                submissions.append(submission)
+
+            cls.objects.bulk_create(created)
+            cls.objects.bulk_update(updated, ("responses", "selected"))
+        return submissions
+
+    def get_responses(self):
+        # Text is only kept for select polls when some of it no longer matched a choice, see migration 0057
+        if self.responses:
+            return self.responses
+        return self.poll.decode(self.selected)
+
+
+class PollTally(Model):
+    class Meta:
+        constraints = [UniqueConstraint(name="%(app_label)s_%(class)s_poll_choice", fields=("poll", "choice_index"))]
+
+    poll = ForeignKey(Poll, on_delete=CASCADE, related_name="tallies")
+    choice_index = PositiveSmallIntegerField()
+    count = IntegerField(default=0)
+
+    @classmethod
+    def rebuild(cls):
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {PollSubmission._meta.db_table} IN SHARE MODE")
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (poll_id, choice_index, count)
+                SELECT s.poll_id, r.choice_index, count(*)
+                FROM {PollSubmission._meta.db_table} s
+                CROSS JOIN LATERAL unnest(s.selected) AS r(choice_index)
+                GROUP BY s.poll_id, r.choice_index
+                """
+            )
+
+    @classmethod
+    def apply(cls, poll_id, added=(), removed=()):
+        deltas = Counter(added)
+        deltas.subtract(removed)
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            increments = [(poll_id, index, delta) for index, delta in deltas.items() if delta > 0]
+            if increments:
+                cursor.executemany(
+                    f"INSERT INTO {table} (poll_id, choice_index, count) VALUES (%s, %s, %s) "
+                    f"ON CONFLICT (poll_id, choice_index) DO UPDATE SET count = {table}.count + EXCLUDED.count",
+                    increments,
+                )
+            # Decrements never insert, so a cascade that already removed the poll's tallies stays a no-op
+            decrements = [(-delta, poll_id, index) for index, delta in deltas.items() if delta < 0]
+            if decrements:
+                cursor.executemany(
+                    f"UPDATE {table} SET count = count - %s WHERE poll_id = %s AND choice_index = %s", decrements
+                )
 
 
 class Prize(Model):
     class Meta:
         ordering = ("points",)
+        indexes = [Index(name="core_prize_points_id", fields=("points", "id"))]
 
     organization = ForeignKey(Organization, on_delete=CASCADE, related_name="prizes")
 
@@ -369,6 +661,18 @@ class SchedulePeriod(Model):
     end = TimeField()
 
 
+class MeetingSlot(Model):
+    class Meta:
+        ordering = ("day", "start_time")
+        indexes = [Index(name="core_meetingslot_day_start", fields=("day", "start_time"))]
+
+    organization = ForeignKey(Organization, on_delete=CASCADE, related_name="meeting_slots")
+    day = IntegerField(choices=DayOfWeek.choices)
+    period = ForeignKey(Period, on_delete=SET_NULL, null=True, blank=True, related_name="+")
+    start_time = TimeField(null=True, blank=True)
+    end_time = TimeField(null=True, blank=True)
+
+
 def validate_guess(value):
     if value not in wordle.VALID_GUESSES:
         raise ValidationError("Invalid guess")
@@ -412,6 +716,7 @@ class Ping(Model):
 class CalendarEvent(Model):
     class Meta:
         ordering = ("start",)
+        indexes = [Index(name="core_calendarevent_user_start", fields=("user", "start", "id"))]
 
     user = ForeignKey(USER_MODEL, on_delete=CASCADE, related_name="calendar_events")
     title = CharField(max_length=200)
@@ -423,6 +728,11 @@ class CalendarEvent(Model):
         return f"{self.title} — {self.user}"
 
 
+@receiver(pre_save, sender=Post)
+def render_post_content(*, instance, **kwargs):
+    instance.render_content()
+
+
 @receiver(pre_save, sender=Post)
 def before_send_post_notifications(*, instance, **kwargs):
     try:
@@ -441,7 +751,66 @@ def send_post_notifications(*, instance, created, **kwargs):
     tokens = instance.organization.memberships.filter(active=True).values("user__expo_push_tokens__token")
     tokens = [token for x in tokens if (token := x["user__expo_push_tokens__token"])]
 
-    send_notifications(tokens, instance.title, instance.content[:300])
+    send_notifications(tokens, instance.title, instance.excerpt)
+
+
+@receiver(post_save, sender=Post)
+def sync_post_inbox(*, instance, **kwargs):
+    instance.sync_inbox()
+
+
+@receiver(pre_save, sender=Membership)
+def before_sync_membership_inbox(*, instance, **kwargs):
+    try:
+        instance._pre_save_instance = Membership.objects.get(pk=instance.pk)
+    except Membership.DoesNotExist:
+        instance._pre_save_instance = None
+
+
+@receiver(post_save, sender=Membership)
+def sync_membership_inbox(*, instance, **kwargs):
+    was_active = instance._pre_save_instance is not None and instance._pre_save_instance.active
+    if instance.active and not was_active:
+        InboxItem.add_memberships([instance.user_id], [instance.organization_id])
+    elif was_active and not instance.active:
+        InboxItem.remove_memberships([instance.user_id], [instance.organization_id])
+
+
+@receiver(post_delete, sender=Membership)
+def remove_membership_inbox(*, instance, **kwargs):
+    InboxItem.remove_memberships([instance.user_id], [instance.organization_id])
+
+
+@receiver(m2m_changed, sender=Membership)
+def sync_members_inbox(*, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if action == "pre_clear":
+        pk_set = list(instance.memberships.values_list("user_id" if reverse else "organization_id", flat=True))
+    user_ids, organization_ids = (pk_set, [instance.pk]) if reverse else ([instance.pk], pk_set)
+    if action == "post_add":
+        InboxItem.add_memberships(user_ids, organization_ids)
+    else:
+        InboxItem.remove_memberships(user_ids, organization_ids)
+
+
+@receiver(pre_save, sender=PollSubmission)
+def before_update_poll_tallies(*, instance, **kwargs):
+    try:
+        instance._pre_save_instance = PollSubmission.objects.get(pk=instance.pk)
+    except PollSubmission.DoesNotExist:
+        instance._pre_save_instance = None
+
+
+@receiver(post_save, sender=PollSubmission)
+def update_poll_tallies(*, instance, **kwargs):
+    removed = instance._pre_save_instance.selected if instance._pre_save_instance else ()
+    PollTally.apply(instance.poll_id, added=instance.selected, removed=removed)
+
+
+@receiver(post_delete, sender=PollSubmission)
+def remove_poll_tallies(*, instance, **kwargs):
+    PollTally.apply(instance.poll_id, removed=instance.selected)
 
 
 @receiver(post_save, sender=Ping)
@@ -469,11 +838,16 @@ def add_required_orgs(*, instance, **kwargs):
     orgs = Organization.objects.filter(q)
     instance.organizations.add(*orgs)
 
-    remove_orgs = Organization.objects.exclude(required_grad_year__isnull=True)
+    remove_orgs = instance.organizations.exclude(required_grad_year__isnull=True)
     remove_orgs = remove_orgs.exclude(required_grad_year=instance.grad_year)
     instance.organizations.remove(*remove_orgs)
 
 
+@receiver(post_save, sender=Organization)
+def update_meeting_slots(*, instance, **kwargs):
+    instance.sync_meeting_slots()
+
+
 @receiver(post_save, sender=Organization)
 def add_required_users(*, instance, **kwargs):
     if instance.required:
@@ -496,18 +870,21 @@ def before_add_all_points_(*, instance, **kwargs):
 
 @receiver(post_save, sender=Event)
 def add_all_points(*, instance, created, **kwargs):
-    if instance._pre_save_instance:
+    if instance._pre_save_instance and instance.points != instance._pre_save_instance.points:
         diff = instance.points - instance._pre_save_instance.points
-        Membership.objects.filter(organization=instance.organization, user__in=instance.users.all()).update(
-            points=F("points") + diff
-        )
+        memberships = Membership.objects.filter(organization=instance.organization, user__in=instance.users.all())
+        user_ids = list(memberships.values_list("user_id", flat=True))
+        memberships.update(points=F("points") + diff)
+        # update() sends no signals, so the members' cached profiles are invalidated here
+        invalidate_member_versions(user_ids)
 
 
 @receiver(post_delete, sender=Event)
 def delete_all_points(*, instance, **kwargs):
-    Membership.objects.filter(organization=instance.organization, user__in=instance.users.all()).update(
-        points=F("points") - instance.points
-    )
+    memberships = Membership.objects.filter(organization=instance.organization, user__in=instance.users.all())
+    user_ids = list(memberships.values_list("user_id", flat=True))
+    memberships.update(points=F("points") - instance.points)
+    invalidate_member_versions(user_ids)
 
 
 @receiver(pre_save, sender=Submission)
@@ -533,3 +910,145 @@ def remove_points(*, instance, **kwargs):
     membership, _ = Membership.objects.get_or_create(user=instance.user, organization=instance.event.organization)
     membership.points -= instance.get_points()
     membership.save()
+
+
+@receiver(post_save, sender=Submission)
+def update_submission_count(*, instance, **kwargs):
+    old_event_id = instance._pre_save_instance.event_id if instance._pre_save_instance else None
+    if old_event_id == instance.event_id:
+        return
+    if old_event_id is not None:
+        Event.adjust_submission_count(old_event_id, -1)
+    Event.adjust_submission_count(instance.event_id, 1)
+
+
+@receiver(post_delete, sender=Submission)
+def remove_submission_count(*, instance, **kwargs):
+    Event.adjust_submission_count(instance.event_id, -1)
+
+
+@receiver(m2m_changed, sender=Submission)
+def sync_submission_counts(*, instance, action, reverse, pk_set, **kwargs):
+    # Event.users is the forward side, so reverse means the instance is a User
+    if action == "pre_clear" and reverse:
+        instance._pre_clear_event_ids = list(instance.events.values_list("id", flat=True))
+    if action not in ("post_add", "post_remove", "post_clear") or (action != "post_clear" and not pk_set):
+        return
+    if not reverse:
+        event_ids = [instance.pk]
+    elif action == "post_clear":
+        event_ids = instance._pre_clear_event_ids
+    else:
+        event_ids = pk_set
+    Event.refresh_submission_counts(event_ids)
+
+
+@receiver(post_save, sender=Membership)
+def update_member_count(*, instance, **kwargs):
+    old = instance._pre_save_instance
+    old_organization_id = old.organization_id if old is not None and old.active else None
+    new_organization_id = instance.organization_id if instance.active else None
+    if old_organization_id == new_organization_id:
+        return
+    if old_organization_id is not None:
+        Organization.adjust_member_count(old_organization_id, -1)
+    if new_organization_id is not None:
+        Organization.adjust_member_count(new_organization_id, 1)
+
+
+@receiver(post_delete, sender=Membership)
+def remove_member_count(*, instance, **kwargs):
+    if instance.active:
+        Organization.adjust_member_count(instance.organization_id, -1)
+
+
+@receiver(m2m_changed, sender=Membership)
+def record_removed_memberships(*, instance, action, reverse, pk_set, **kwargs):
+    # remove() sends every id it was given, so keep the ones that were members for the receivers below
+    if action != "pre_remove":
+        return
+    if reverse:
+        removed = instance.memberships.filter(user_id__in=pk_set).values_list("user_id", flat=True)
+    else:
+        removed = instance.memberships.filter(organization_id__in=pk_set).values_list("organization_id", flat=True)
+    instance._removed_membership_ids = set(removed)
+
+
+@receiver(m2m_changed, sender=Membership)
+def sync_member_counts(*, instance, action, reverse, pk_set, **kwargs):
+    # User.organizations is the forward side, so reverse means the instance is an Organization
+    if action == "pre_clear" and not reverse:
+        instance._pre_clear_organization_ids = list(instance.memberships.values_list("organization_id", flat=True))
+    if action == "post_remove":
+        pk_set = instance._removed_membership_ids
+    # add() sends an empty pk_set when nothing changed
+    if action not in ("post_add", "post_remove", "post_clear") or (action != "post_clear" and not pk_set):
+        return
+    if reverse:
+        organization_ids = [instance.pk]
+    elif action == "post_clear":
+        organization_ids = instance._pre_clear_organization_ids
+    else:
+        organization_ids = pk_set
+    Organization.refresh_member_counts(organization_ids)
+
+
+@receiver(m2m_changed, sender=Membership)
+def invalidate_members_agenda(*, instance, action, reverse, pk_set, **kwargs):
+    if action == "post_remove":
+        pk_set = instance._removed_membership_ids
+    if action not in ("post_add", "post_remove", "pre_clear") or (action != "pre_clear" and not pk_set):
+        return
+    if reverse:
+        user_ids = list(instance.memberships.values_list("user_id", flat=True) if pk_set is None else pk_set)
+    else:
+        user_ids = [instance.pk]
+    invalidate_member_versions(user_ids)
+
+
+@receiver(m2m_changed, sender=Submission)
+def invalidate_attendee_profiles(*, instance, action, reverse, pk_set, **kwargs):
+    # Event.users is the forward side, so reverse means the instance is a User
+    if action == "pre_clear" and not reverse:
+        instance._pre_clear_user_ids = list(instance.users.values_list("id", flat=True))
+    if action not in ("post_add", "post_remove", "post_clear") or (action != "post_clear" and not pk_set):
+        return
+    if reverse:
+        user_ids = [instance.pk]
+    elif action == "post_clear":
+        user_ids = instance._pre_clear_user_ids
+    else:
+        user_ids = pk_set
+    invalidate_member_versions(user_ids)
+
+
+@receiver(m2m_changed, sender=Organization.advisors.through)
+@receiver(m2m_changed, sender=Organization.admins.through)
+@receiver(post_delete, sender=User)
+def invalidate_catalog(**kwargs):
+    caching.bump_versions("catalog")
+
+
+# User fields shown for advisors and admins in the catalog, see NestedUserSerializer
+CATALOG_USER_FIELDS = {"first_name", "last_name", "type", "wordle_streak"}
+
+
+@receiver(post_save, sender=User)
+def invalidate_catalog_user(*, instance, created, update_fields, **kwargs):
+    # Skips the last_login update on each login, among others
+    if created or (update_fields is not None and not CATALOG_USER_FIELDS.intersection(update_fields)):
+        return
+    if Organization.objects.filter(Q(advisors=instance) | Q(admins=instance)).exists():
+        caching.bump_versions("catalog")
+
+
+caching.register(Organization, "agenda", "catalog", "profile:organizations")
+caching.register(OrganizationLink, "catalog")
+caching.register(MeetingSlot, "catalog")
+caching.register(Event, "agenda")
+caching.register(Schedule, "agenda", "schedules")
+caching.register(SchedulePeriod, "agenda", "schedules")
+caching.register(Period, "schedules")
+caching.register(CalendarEvent, lambda x: agenda_version(x.user_id))
+caching.register(Membership, lambda x: agenda_version(x.user_id), lambda x: profile_version(x.user_id))
+caching.register(User, lambda x: user_version(x.pk))
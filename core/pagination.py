@@ -0,0 +1,104 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(pagination.BasePagination):
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    invalid_cursor_message = "Invalid cursor"
+
+    # Fields must be non-null and, taken together, unique, e.g. ("-date", "-id")
+    ordering = ("-id",)
+
+    def get_ordering(self, view):
+        return getattr(view, "pagination_ordering", self.ordering)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(view)
+        self.fields = [queryset.model._meta.get_field(x.lstrip("-")) for x in self.ordering]
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.decode_cursor(cursor))
+
+        page = list(queryset[: self.page_size + 1])
+        self.next_position = page[self.page_size - 1] if len(page) > self.page_size else None
+        return page[: self.page_size]
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(raw) != len(self.fields):
+                raise ValueError("Wrong number of cursor values")
+            values = [field.to_python(value) for field, value in zip(self.fields, raw)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # (a, b) > (x, y) becomes a > x OR (a = x AND b > y), with each comparison flipped for descending fields
+        q = None
+        for name, field, value in reversed(list(zip(self.ordering, self.fields, values))):
+            lookup = "lt" if name.startswith("-") else "gt"
+            after = Q(**{f"{field.attname}__{lookup}": value})
+            q = after if q is None else after | (Q(**{field.attname: value}) & q)
+        return q
+
+    def encode_cursor(self, obj):
+        raw = [field.value_to_string(obj) for field in self.fields]
+        return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode()
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+
+class OptionalKeysetPagination(KeysetPagination):
+    # Lists stay unpaginated unless the client asks for a page with ?limit= or ?cursor=
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class SmallPages(pagination.PageNumberPagination):
+    page_size = 20
+
+
+class PageNumberOrKeysetPagination(KeysetPagination):
+    # ?page= with a count stays the default for existing app builds, ?limit= or ?cursor= opts into keyset pages
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param in params or self.page_size_query_param in params:
+            self.page_numbers = None
+            return super().paginate_queryset(queryset, request, view)
+        self.page_numbers = SmallPages()
+        return self.page_numbers.paginate_queryset(queryset.order_by(*self.get_ordering(view)), request, view)
+
+    def get_paginated_response(self, data):
+        if self.page_numbers is not None:
+            return self.page_numbers.get_paginated_response(data)
+        return super().get_paginated_response(data)
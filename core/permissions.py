@@ -9,7 +9,7 @@ class UserAccessPolicy(AccessPolicy):
     ]
 
     def is_user(self, request, view, *args, **kwargs):
-        return view.get_object() == request.user
+        return view.kwargs.get("pk") in ("me", str(request.user.id))
 
     @classmethod
     def scope_queryset(cls, request, qs):
@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from core import caching, db, models, serializers
+
+ORGANIZATIONS_VERSION = "profile:organizations"
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def get_etag(user_id):
+    versions = caching.get_versions(
+        models.user_version(user_id), models.profile_version(user_id), ORGANIZATIONS_VERSION
+    )
+    return caching.make_etag("profile", user_id, *versions)
+
+
+def build_profile(user_id):
+    memberships = models.Membership.objects.select_related("organization")
+    user = get_user_model().objects.prefetch_related(Prefetch("memberships", memberships)).get(pk=user_id)
+    return serializers.UserSerializer(user).data
+
+
+def get_profile(user_id, etag):
+    key = f"profile:{user_id}:{etag}"
+    data = cache.get(key)
+    if data is None:
+        with db.reading_from(db.PRIMARY):
+            data = build_profile(user_id)
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,52 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import qrcode
+from datauri import DataURI
+from django.core.cache import cache
+from qrcode.image.svg import SvgPathFillImage
+
+CACHE_TIMEOUT = 30 * 24 * 60 * 60
+# Below this many uncached codes, starting worker processes costs more than it saves
+POOL_THRESHOLD = 16
+POOL_CHUNK_SIZE = 8
+
+
+def event_url(code):
+    return f"lhs://{code}"
+
+
+def cache_key(code):
+    return f"qr:svg:{code}"
+
+
+def render(code):
+    image = qrcode.make(event_url(code), image_factory=SvgPathFillImage, box_size=50, border=0)
+    return image.to_string().decode()
+
+
+def get_svgs(codes):
+    codes = list(dict.fromkeys(codes))
+    cached = cache.get_many([cache_key(x) for x in codes])
+    svgs = {x: cached[cache_key(x)] for x in codes if cache_key(x) in cached}
+
+    missing = [x for x in codes if x not in svgs]
+    if len(missing) >= POOL_THRESHOLD:
+        # Forking a worker with running threads (the cache listener) and open connections can deadlock on locks
+        # it inherited, so the workers come from a clean server process. They import this module to find render.
+        with ProcessPoolExecutor(mp_context=multiprocessing.get_context("forkserver")) as executor:
+            rendered = list(executor.map(render, missing, chunksize=POOL_CHUNK_SIZE))
+    else:
+        rendered = [render(x) for x in missing]
+
+    cache.set_many({cache_key(x): svg for x, svg in zip(missing, rendered)}, CACHE_TIMEOUT)
+    svgs.update(zip(missing, rendered))
+    return svgs
+
+
+def get_svg(code):
+    return get_svgs([code])[code]
+
+
+def to_data_uri(svg):
+    return DataURI.make("image/svg+xml", charset="UTF-8", base64=True, data=svg)
@@ -0,0 +1,43 @@
+import html
+import re
+
+import markdown
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+from markdown.treeprocessors import Treeprocessor
+
+EXCERPT_LENGTH = 300
+SAFE_SCHEMES = {"http", "https", "mailto", "tel"}
+SCHEME_RE = re.compile(r"^([a-z][a-z0-9+.-]*):")
+
+
+def is_safe_url(url):
+    url = re.sub(r"[\x00-\x20]", "", html.unescape(url)).lower()
+    match = SCHEME_RE.match(url)
+    return match is None or match.group(1) in SAFE_SCHEMES
+
+
+class SanitizeTreeprocessor(Treeprocessor):
+    def run(self, root):
+        for el in root.iter():
+            for attr in ("href", "src"):
+                if el.get(attr) is not None and not is_safe_url(el.get(attr)):
+                    del el.attrib[attr]
+
+
+class SanitizeExtension(markdown.Extension):
+    def extendMarkdown(self, md):
+        # Without these, raw HTML in the source is escaped instead of passed through
+        md.preprocessors.deregister("html_block")
+        md.inlinePatterns.deregister("html")
+        # Runs after the inline patterns (priority 20) have created links and images
+        md.treeprocessors.register(SanitizeTreeprocessor(md), "sanitize", 0)
+
+
+def render_markdown(text):
+    return markdown.markdown(text, extensions=[SanitizeExtension()])
+
+
+def make_excerpt(rendered, length=EXCERPT_LENGTH):
+    text = " ".join(html.unescape(strip_tags(rendered)).split())
+    return Truncator(text).chars(length)
@@ -0,0 +1,46 @@
+from collections import namedtuple
+
+from django.db.models import Value
+
+from core.models import Organization
+
+ADMIN = "admin"
+ADVISOR = "advisor"
+
+
+class Roles(namedtuple("Roles", ("admin_ids", "advisor_ids"))):
+    @property
+    def organization_ids(self):
+        return self.admin_ids | self.advisor_ids
+
+    def is_admin(self, organization_id):
+        return organization_id in self.admin_ids
+
+    def is_advisor(self, organization_id):
+        return organization_id in self.advisor_ids
+
+    def can_manage(self, organization_id):
+        return organization_id in self.admin_ids or organization_id in self.advisor_ids
+
+
+def load_roles(user):
+    if not user.is_authenticated:
+        return Roles(frozenset(), frozenset())
+
+    admins = Organization.admins.through.objects.filter(user_id=user.id).values_list("organization_id", Value(ADMIN))
+    advisors = Organization.advisors.through.objects.filter(user_id=user.id).values_list(
+        "organization_id", Value(ADVISOR)
+    )
+    rows = list(admins.union(advisors, all=True))
+    return Roles(
+        frozenset(id for id, role in rows if role == ADMIN),
+        frozenset(id for id, role in rows if role == ADVISOR),
+    )
+
+
+def get_roles(request):
+    # Memoized on the underlying HttpRequest so DRF and admin code share one lookup
+    request = getattr(request, "_request", request)
+    if getattr(request, "_roles", None) is None:
+        request._roles = load_roles(request.user)
+    return request._roles
@@ -0,0 +1,30 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+CONFIG = "english"
+RESULT_LIMIT = 20
+
+
+# Queries must use exactly these expressions for Postgres to match them to the GIN indexes on each model
+def post_vector():
+    return SearchVector("title", weight="A", config=CONFIG) + SearchVector("content", weight="B", config=CONFIG)
+
+
+def organization_vector():
+    return SearchVector("name", weight="A", config=CONFIG) + SearchVector("description", weight="B", config=CONFIG)
+
+
+def event_vector():
+    return SearchVector("name", weight="A", config=CONFIG) + SearchVector("description", weight="B", config=CONFIG)
+
+
+def make_query(text):
+    return SearchQuery(text, search_type="websearch", config=CONFIG)
+
+
+def search(qs, vector, query, limit=RESULT_LIMIT):
+    return (
+        qs.alias(search_vector=vector)
+        .filter(search_vector=query)
+        .annotate(search_rank=SearchRank(vector, query))
+        .order_by("-search_rank", "id")[:limit]
+    )
@@ -91,6 +91,12 @@ class OrganizationLinkSerializer(serializers.ModelSerializer):
         fields = ("title", "url")
 
 
+class MeetingSlotSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.MeetingSlot
+        fields = ("day", "period", "start_time", "end_time")
+
+
 class OrganizationSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Organization
@@ -109,17 +115,29 @@ class OrganizationSerializer(serializers.ModelSerializer):
             "description",
             "category",
             "links",
+            "meeting_slots",
+            "active_member_count",
         )
 
     advisors = NestedUserSerializer(many=True, read_only=True)
     admins = NestedUserSerializer(many=True, read_only=True)
     links = OrganizationLinkSerializer(many=True, read_only=True)
+    meeting_slots = MeetingSlotSerializer(many=True, read_only=True)
 
 
 class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Post
-        fields = ("id", "url", "organization", "title", "date", "content", "published")
+        fields = ("id", "url", "organization", "title", "date", "content", "content_html", "excerpt", "published")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # ?content=html sends the pre-rendered HTML in place of the Markdown source
+        request = self.context.get("request")
+        if request is not None and request.query_params.get("content") == "html":
+            self.fields.pop("content")
+        else:
+            self.fields.pop("content_html")
 
     organization = NestedOrganizationSerializer(read_only=True)
 
@@ -127,9 +145,48 @@ class PostSerializer(serializers.ModelSerializer):
 class PollSubmissionSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.PollSubmission
-        fields = ("id", "poll", "user", "responses")
+        fields = ("id", "poll", "user", "responses", "selected")
 
     user = serializers.PrimaryKeyRelatedField(read_only=True)
+    responses = serializers.ListField(child=serializers.CharField(), required=False)
+    selected = serializers.ListField(child=serializers.IntegerField(min_value=0), required=False)
+
+    def validate(self, data):
+        poll = data["poll"]
+        responses = data.get("responses")
+        selected = data.get("selected")
+
+        if poll.type != models.PollType.SELECT:
+            if responses is None:
+                raise serializers.ValidationError({"responses": "This field is required."})
+            if selected:
+                raise serializers.ValidationError({"selected": "Short answer polls take text responses."})
+            data["selected"] = []
+            return data
+
+        # Older app builds send the choice text in responses instead
+        if selected is None and responses is None:
+            raise serializers.ValidationError({"selected": "This field is required."})
+        if selected is None:
+            try:
+                selected = poll.encode(responses)
+            except ValueError:
+                raise serializers.ValidationError({"responses": "Invalid choice."})
+        if len(set(selected)) != len(selected) or any(i >= len(poll.choices) for i in selected):
+            raise serializers.ValidationError({"selected": "Invalid choice."})
+        if not poll.min_values <= len(selected) <= poll.max_values:
+            raise serializers.ValidationError(
+                {"selected": f"Please select between {poll.min_values} and {poll.max_values} choices."}
+            )
+
+        data["selected"] = selected
+        data["responses"] = []
+        return data
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data["responses"] = instance.get_responses()
+        return data
 
 
 class PollSerializer(serializers.ModelSerializer):
@@ -140,8 +197,22 @@ class PollSerializer(serializers.ModelSerializer):
     submissions = serializers.SerializerMethodField()
 
     def get_submissions(self, poll):
-        request = self.context.get("request")
-        return PollSubmissionSerializer(poll.submissions.filter(user=request.user), many=True).data
+        # Set by views.with_user_submissions
+        if hasattr(poll, "user_submissions"):
+            submissions = poll.user_submissions
+        else:
+            request = self.context.get("request")
+            submissions = poll.submissions.filter(user=request.user)
+        for submission in submissions:
+            submission.poll = poll
+        return PollSubmissionSerializer(submissions, many=True).data
+
+
+class ExpandedPostSerializer(PostSerializer):
+    class Meta(PostSerializer.Meta):
+        fields = (*PostSerializer.Meta.fields, "polls")
+
+    polls = PollSerializer(many=True, read_only=True)
 
 
 class MembershipSerializer(serializers.ModelSerializer):
@@ -0,0 +1,12 @@
+from django.conf import settings
+from google.oauth2.service_account import Credentials
+from storages.backends import gcloud
+
+
+class GoogleCloudStorage(gcloud.GoogleCloudStorage):
+    # Credentials are read from the service account file on first use, not when settings are imported
+    @property
+    def client(self):
+        if self._client is None and self.credentials is None:
+            self.credentials = Credentials.from_service_account_file(settings.GS_CREDENTIALS_FILE)
+        return super().client
@@ -1,3 +1,188 @@
-from django.test import TestCase
+import io
+import tempfile
+from datetime import time, timedelta
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.management import CommandError, call_command
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import caching, meetings
+from core.models import (
+    ClubCategory,
+    Organization,
+    OrganizationType,
+    Poll,
+    PollType,
+    Post,
+    User,
+    UserType,
+    agenda_version,
+    profile_version,
+)
+
+
+@override_settings(INVALIDATION_LISTEN=False)
+class RequiredOrganizationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizations = [
+            Organization.objects.create(type=OrganizationType.CLASS, name=f"Class of {x}", required_grad_year=x)
+            for x in (2024, 2025)
+        ]
+        User.objects.create(email="other@example.com", type=UserType.STUDENT, grad_year=2025)
+
+    def member_counts(self):
+        return list(Organization.objects.order_by("id").values_list("active_member_count", flat=True))
+
+    def test_resave_changes_no_counts(self):
+        user = User.objects.create(email="student@example.com", type=UserType.STUDENT, grad_year=2024)
+        counts = self.member_counts()
+        (catalog,) = caching.get_versions("catalog")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+
+        self.assertEqual(caching.get_versions("catalog"), [catalog])
+        self.assertEqual(self.member_counts(), counts)
+
+    def test_resave_keeps_member_versions(self):
+        user = User.objects.create(email="student@example.com", type=UserType.STUDENT, grad_year=2024)
+        versions = caching.get_versions(agenda_version(user.pk), profile_version(user.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+
+        self.assertEqual(caching.get_versions(agenda_version(user.pk), profile_version(user.pk)), versions)
+
+    def test_removing_non_member_keeps_member_versions(self):
+        user = User.objects.create(email="student@example.com", type=UserType.STUDENT, grad_year=2024)
+        versions = caching.get_versions(agenda_version(user.pk), profile_version(user.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.organizations.remove(self.organizations[1])
+
+        self.assertEqual(caching.get_versions(agenda_version(user.pk), profile_version(user.pk)), versions)
+
+
+@override_settings(INVALIDATION_LISTEN=False)
+class PollSubmitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(
+            type=OrganizationType.CLUB, name="Robotics", category=ClubCategory.COMPETITION
+        )
+        cls.post = Post.objects.create(organization=cls.organization, title="Survey", content="", published=True)
+        cls.poll = Poll.objects.create(
+            post=cls.post, type=PollType.SELECT, description="Pick one", choices=["a", "b"], min_values=1, max_values=1
+        )
+        cls.member = User.objects.create(email="member@example.com", type=UserType.STUDENT)
+        cls.admin = User.objects.create(email="admin@example.com", type=UserType.STUDENT)
+        cls.organization.admins.add(cls.admin)
+
+    def submit(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        data = [{"poll": self.poll.id, "selected": [1]}]
+        return client.post(f"/api/posts/{self.post.id}/polls/submit/", data, format="json")
+
+    def test_member_gets_no_results(self):
+        response = self.submit(self.member)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("results", response.data[0])
+        self.assertEqual(response.data[0]["submission"]["selected"], [1])
+
+    def test_admin_gets_results(self):
+        response = self.submit(self.admin)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("results", response.data[0])
+
+
+class MeetingTimeTests(SimpleTestCase):
+    periods = meetings.period_names([("3", "3"), ("4", "4"), ("lunch", "Lunch")])
+
+    def test_time_is_not_a_period(self):
+        (slot,) = meetings.parse_meeting_time("4:00 PM", 0, self.periods)
+
+        self.assertIsNone(slot.period_id)
+        self.assertEqual(slot.start_time, time(16, 0))
+
+    def test_time_range_is_not_a_period(self):
+        (slot,) = meetings.parse_meeting_time("3:30-4:30", 0, self.periods)
+
+        self.assertIsNone(slot.period_id)
+        self.assertEqual((slot.start_time, slot.end_time), (time(15, 30), time(16, 30)))
+
+    def test_period_name(self):
+        (slot,) = meetings.parse_meeting_time("Thursday lunch, room 3", None, self.periods)
+
+        self.assertEqual((slot.day, slot.period_id), (3, "lunch"))
+
+
+@override_settings(INVALIDATION_LISTEN=False)
+class ImportClubsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name in ("Robotics Club", "Lynbrook Robotics"):
+            Organization.objects.create(type=OrganizationType.CLUB, name=name, category=ClubCategory.COMPETITION)
+
+    def import_clubs(self, *names):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as f:
+            f.write("Club Name\n" + "".join(f"{x}\n" for x in names))
+            f.flush()
+            call_command("import_roster", clubs=f.name, stdout=io.StringIO())
+
+    def test_ambiguous_name_creates_no_club(self):
+        self.import_clubs("Robotics")
+
+        self.assertEqual(Organization.objects.filter(type=OrganizationType.CLUB).count(), 2)
+
+    def test_exact_name_picks_its_club(self):
+        self.import_clubs("Robotics Club", "New Club Name")
+
+        self.assertEqual(Organization.objects.filter(type=OrganizationType.CLUB).count(), 3)
+
+    def test_empty_name_is_rejected(self):
+        with self.assertRaises(CommandError):
+            self.import_clubs("The Club")
+
+
+@override_settings(INVALIDATION_LISTEN=False)
+class ImportUsersTests(TestCase):
+    def test_renaming_advisor_bumps_catalog(self):
+        advisor = User.objects.create(email="advisor@example.com", type=UserType.STAFF, first_name="Ann")
+        organization = Organization.objects.create(
+            type=OrganizationType.CLUB, name="Robotics", category=ClubCategory.COMPETITION
+        )
+        organization.advisors.add(advisor)
+        (catalog,) = caching.get_versions("catalog")
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as f:
+            f.write("Email,First Name,Last Name,Grad Year\nadvisor@example.com,Anne,Lee,\n")
+            f.flush()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("import_roster", users=f.name, stdout=io.StringIO())
+
+        self.assertNotEqual(caching.get_versions("catalog"), [catalog])
+
+
+@override_settings(INVALIDATION_LISTEN=False)
+class AsyncAuthenticationTests(SimpleTestCase):
+    def test_expired_token_matches_sync_route(self):
+        token = AccessToken.for_user(User(pk=1))
+        token.set_exp(lifetime=-timedelta(minutes=1))
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+        expected = Client().get("/api/events/", **headers)
+        with override_settings(ROOT_URLCONF="lynbrook_app.asgi_urls"):
+            # Django 3.2's AsyncClient takes raw header names
+            response = async_to_sync(AsyncClient().get)("/api/events/", authorization=headers["HTTP_AUTHORIZATION"])
+
+        self.assertEqual(expected.status_code, 401)
+        self.assertEqual(expected.json()["code"], "token_not_valid")
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual(response["WWW-Authenticate"], expected["WWW-Authenticate"])
@@ -11,6 +11,7 @@ users.register("events", views.SubmissionViewSetOld, basename="user-event", pare
 users.register("submissions", views.SubmissionViewSet, basename="user-submission", parents_query_lookups=["user"])
 users.register("tokens", views.ExpoPushTokenViewSet, basename="user-token", parents_query_lookups=["user"])
 users.register("wordle_entries", views.WordleEntryViewSet, basename="user-wordle-entry", parents_query_lookups=["user"])
+users.register("agenda", views.AgendaViewSet, basename="user-agenda", parents_query_lookups=["user"])
 users.register(
     "calendar_events", views.CalendarEventViewSet, basename="user-calendar-event", parents_query_lookups=["user"]
 )
@@ -34,6 +35,8 @@ urlpatterns = [
     path("api/schedules/current/", views.CurrentScheduleView.as_view()),
     path("api/schedules/next/", views.NextScheduleView.as_view()),
     path("api/app_version/", views.AppVersionView.as_view()),
+    path("api/search/", views.SearchView.as_view()),
+    path("api/agenda/<str:token>.ics", views.AgendaFeedView.as_view(), name="agenda-feed"),
     path("api/", include(router.urls)),
     path("", views.IndexView.as_view()),
 ]
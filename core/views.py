@@ -2,25 +2,73 @@ from abc import ABC, abstractmethod
 from datetime import date, datetime, timedelta, timezone
 
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
-from django.db.models import Q
+from django.core import signing
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, Q
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.timezone import localtime
 from django.views.generic.base import TemplateView
-from rest_framework import mixins, pagination, parsers, status, views, viewsets
+from rest_framework import mixins, parsers, status, views, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework_extensions.mixins import NestedViewSetMixin
 
 from core.permissions import NestedUserAccessPolicy, UserAccessPolicy
 
-from . import models, serializers
+from . import agenda, caching, catalog, db, models, pagination, profile, roles, search, serializers
+
+WEEK_CACHE_TIMEOUT = 24 * 60 * 60
+RESPONSE_CACHE_TIMEOUT = 24 * 60 * 60
+APP_VERSION = {"android": 26, "ios": "2.2.0"}
+
+
+class CachedResponseMixin:
+    # Caches list and retrieve responses until one of cache_versions is bumped
+    cache_versions = ()
+    cache_per_user = False
+    cache_alias = "default"
+    cache_timeout = RESPONSE_CACHE_TIMEOUT
+
+    def get_cache_etag(self, request):
+        return caching.make_etag(
+            type(self).__name__,
+            self.action,
+            request.build_absolute_uri("/"),
+            sorted(self.kwargs.items()),
+            sorted(request.query_params.lists()),
+            request.user.pk if self.cache_per_user else None,
+            *caching.get_versions(*self.cache_versions),
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        etag = self.get_cache_etag(request)
+        if caching.etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        backend = caches[self.cache_alias]
+        key = f"response:{etag}"
+        data = backend.get(key)
+        if data is None:
+            with db.reading_from(db.PRIMARY):
+                response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            backend.set(key, data, self.cache_timeout)
+        return Response(data, headers={"ETag": etag})
 
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
 
-class IndexView(TemplateView):
-    template_name = "core/index.html"
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
 
 
-class SmallPages(pagination.PageNumberPagination):
-    page_size = 20
+class IndexView(TemplateView):
+    template_name = "core/index.html"
 
 
 class NestedUserViewSetMixin(NestedViewSetMixin):
@@ -41,6 +89,8 @@ class NestedUserViewSetMixin(NestedViewSetMixin):
                 pass
         else:
             return None
+        if str(user_id) == str(self.request.user.id):
+            return self.request.user
         return get_user_model().objects.get(pk=user_id)
 
 
@@ -64,6 +114,13 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet, mixins.UpdateModelMixin):
         else:
             return qs
 
+    def retrieve(self, request, *args, **kwargs):
+        # The access policy only allows users to retrieve themselves
+        etag = profile.get_etag(request.user.id)
+        if caching.etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return Response(profile.get_profile(request.user.id, etag), headers={"ETag": etag})
+
 
 class ExpoPushTokenViewSet(
     NestedUserViewSetMixin, viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin
@@ -111,6 +168,8 @@ class SubmissionViewSet(NestedUserViewSetMixin, viewsets.ReadOnlyModelViewSet, m
     permission_classes = (NestedUserAccessPolicy,)
     queryset = models.Submission.objects.all()
     lookup_field = "event"
+    pagination_class = pagination.OptionalKeysetPagination
+    pagination_ordering = ("-created_at", "-id")
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -134,6 +193,8 @@ class CalendarEventViewSet(NestedUserViewSetMixin, viewsets.ModelViewSet):
     permission_classes = (NestedUserAccessPolicy,)
     queryset = models.CalendarEvent.objects.all()
     serializer_class = serializers.CalendarEventSerializer
+    pagination_class = pagination.OptionalKeysetPagination
+    pagination_ordering = ("start", "id")
 
     def perform_create(self, serializer):
         serializer.save(user=self.get_user())
@@ -143,6 +204,8 @@ class WordleEntryViewSet(NestedUserViewSetMixin, viewsets.ReadOnlyModelViewSet,
     permission_classes = (NestedUserAccessPolicy,)
     queryset = models.WordleEntry.objects.all()
     lookup_field = "date"
+    pagination_class = pagination.OptionalKeysetPagination
+    pagination_ordering = ("-date", "-id")
 
     def get_serializer_class(self):
         if self.action == "update":
@@ -162,7 +225,58 @@ class WordleEntryViewSet(NestedUserViewSetMixin, viewsets.ReadOnlyModelViewSet,
         return super().handle_exception(exc)
 
 
+class AgendaViewSet(NestedUserViewSetMixin, viewsets.GenericViewSet):
+    permission_classes = (NestedUserAccessPolicy,)
+
+    def list(self, request, *args, **kwargs):
+        try:
+            year, month = agenda.parse_month(request.query_params.get("month"))
+        except ValueError:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
+        user = self.get_user()
+        etag = agenda.get_etag(user.id, year, month)
+        if caching.etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        data = {"month": f"{year}-{month:02}", "items": agenda.get_agenda(user.id, year, month)}
+        return Response(data, headers={"ETag": etag})
+
+    @action(detail=False)
+    def feed(self, request, *args, **kwargs):
+        path = reverse("agenda-feed", args=[agenda.feed_token(self.get_user())])
+        return Response({"url": request.build_absolute_uri(path)})
+
+
+class AgendaFeedView(views.APIView):
+    authentication_classes = ()
+    permission_classes = ()
+
+    def get(self, r, token):
+        try:
+            user_id = agenda.load_feed_token(token)
+        except signing.BadSignature:
+            raise Http404
+        user = get_object_or_404(get_user_model(), pk=user_id, is_active=True)
+
+        months = agenda.feed_months()
+        etag = caching.make_etag(*(agenda.get_etag(user.id, year, month) for year, month in months))
+        if caching.etag_matches(r, etag):
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        items = {
+            (item["type"], item["id"], item["start"]): item
+            for year, month in months
+            for item in agenda.get_agenda(user.id, year, month)
+        }
+        return HttpResponse(
+            agenda.to_ical(items.values()), content_type="text/calendar; charset=utf-8", headers={"ETag": etag}
+        )
+
+
 class SubmissionViewSetOld(SubmissionViewSet):
+    pagination_class = None
+
     def __tl(self, resp):
         resp.data = [x["event"] for x in resp.data]
         return resp
@@ -181,62 +295,185 @@ class SubmissionViewSetOld(SubmissionViewSet):
         return self.__t(super().create(request, *args, **kwargs))
 
 
-class OrganizationViewSet(viewsets.ReadOnlyModelViewSet):
+class OrganizationViewSet(db.ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = serializers.OrganizationSerializer
+    pagination_class = pagination.OptionalKeysetPagination
+    pagination_ordering = ("type", "name", "id")
 
     def get_queryset(self):
+        qs = catalog.get_queryset()
+
         if "clubs" in self.request.query_params:
             # TODO: Deprecated. Remove when app is updated.
-            return models.Organization.objects.filter(type=3)
+            return qs.filter(type=3)
 
         if "user" in self.request.query_params:
             # TODO: Deprecated. Remove when app is updated.
-            return models.Organization.objects.filter(users=self.request.user)
+            return qs.filter(users=self.request.user)
+
+        slot_filters = {
+            key: self.request.query_params[key] for key in ("day", "period") if key in self.request.query_params
+        }
+        if slot_filters:
+            qs = qs.filter(id__in=models.MeetingSlot.objects.filter(**slot_filters).values("organization"))
+
+        return qs
+
+    def list(self, request, *args, **kwargs):
+        # Filtered and paginated lists are built per request
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        etag = catalog.get_etag()
+        if caching.etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return Response(catalog.get_catalog(request, etag), headers={"ETag": etag})
+
+    @action(detail=False)
+    def meeting(self, request, *args, **kwargs):
+        now = localtime()
+        slots = models.MeetingSlot.objects.filter(day=now.weekday())
+
+        if request.query_params.get("when") == "now":
+            schedule = models.Schedule.get_for_day(now.date())
+            periods = []
+            if schedule.pk is not None:
+                periods = schedule.periods.filter(start__lte=now.time(), end__gte=now.time()).values("period")
+            slots = slots.filter(
+                Q(period__in=periods)
+                | Q(start_time__lte=now.time(), end_time__gte=now.time())
+                | Q(start_time__lte=now.time(), start_time__gte=(now - timedelta(hours=1)).time(), end_time=None)
+            )
+
+        qs = self.get_queryset().filter(id__in=slots.values("organization"))
+        return Response(self.get_serializer(qs, many=True).data)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ValueError):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        return super().handle_exception(exc)
+
 
-        return models.Organization.objects.all()
+def with_user_submissions(polls, user):
+    submissions = models.PollSubmission.objects.filter(user=user).order_by("id")
+    return polls.prefetch_related(Prefetch("submissions", submissions, to_attr="user_submissions"))
 
 
-class PostViewSet(viewsets.ReadOnlyModelViewSet):
-    serializer_class = serializers.PostSerializer
-    pagination_class = SmallPages
+class PostViewSet(db.ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    pagination_class = pagination.PageNumberOrKeysetPagination
+    pagination_ordering = ("-date", "-post_id")
+
+    def get_expand(self):
+        return set(self.request.query_params.get("expand", "").split(","))
 
     def get_queryset(self):
-        return models.Post.objects.filter(published=True, organization__users=self.request.user)
+        qs = models.Post.objects.filter(published=True, inbox_items__user=self.request.user).select_related(
+            "organization"
+        )
+        if self.action == "retrieve" and "polls" in self.get_expand():
+            qs = qs.prefetch_related(
+                Prefetch("polls", with_user_submissions(models.Poll.objects.all(), self.request.user))
+            )
+        return qs
+
+    def get_serializer_class(self):
+        if self.action == "retrieve" and "polls" in self.get_expand():
+            return serializers.ExpandedPostSerializer
+        return serializers.PostSerializer
+
+    def list(self, request, *args, **kwargs):
+        items = models.InboxItem.objects.filter(user=request.user).select_related("post__organization")
+        page = self.paginate_queryset(items)
+        serializer = self.get_serializer([x.post for x in page], many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 class PollViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = serializers.PollSerializer
     queryset = models.Poll.objects.all()
 
+    def get_queryset(self):
+        return with_user_submissions(super().get_queryset(), self.request.user)
+
+    @action(detail=True)
+    def results(self, request, *args, **kwargs):
+        poll = self.get_object()
+        if not (request.user.is_superuser or roles.get_roles(request).can_manage(poll.post.organization_id)):
+            return Response(status=status.HTTP_403_FORBIDDEN)
+
+        if "choice" in request.query_params:
+            submissions = poll.submissions.filter(selected__contains=[int(request.query_params["choice"])])
+            users = get_user_model().objects.filter(id__in=submissions.values("user"))
+            return Response({"poll": poll.id, "users": serializers.NestedUserSerializer(users, many=True).data})
+
+        return Response({"poll": poll.id, "results": poll.get_results()})
+
+    @action(detail=False, methods=["post"])
+    def submit(self, request, *args, **kwargs):
+        serializer = serializers.PollSubmissionSerializer(data=request.data, many=True)
+        # Only the post's own polls are valid
+        serializer.child.fields["poll"].queryset = self.get_queryset().select_related("post")
+
+        with transaction.atomic():
+            serializer.is_valid(raise_exception=True)
+            polls = [x["poll"] for x in serializer.validated_data]
+            if len({x.id for x in polls}) != len(polls):
+                return Response({"poll": ["Each poll may only be answered once."]}, status=status.HTTP_400_BAD_REQUEST)
+            submissions = models.PollSubmission.upsert(request.user, serializer.validated_data)
+
+        data = []
+        for poll, submission in zip(polls, submissions):
+            item = {"poll": poll.id, "submission": serializers.PollSubmissionSerializer(submission).data}
+            # Tallies are only for the post's managers, like the results action
+            if request.user.is_superuser or roles.get_roles(request).can_manage(poll.post.organization_id):
+                item["results"] = poll.get_results()
+            data.append(item)
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ValueError):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        return super().handle_exception(exc)
+
 
 class PollSubmissionViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet, mixins.CreateModelMixin):
     serializer_class = serializers.PollSubmissionSerializer
+    pagination_class = pagination.OptionalKeysetPagination
+    pagination_ordering = ("id",)
 
     def get_queryset(self):
-        return self.filter_queryset_by_parents_lookups(models.PollSubmission.objects.filter(user=self.request.user))
+        qs = models.PollSubmission.objects.filter(user=self.request.user).select_related("poll")
+        return self.filter_queryset_by_parents_lookups(qs)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        (serializer.instance,) = models.PollSubmission.upsert(self.request.user, [serializer.validated_data])
 
 
-class EventViewSet(viewsets.ReadOnlyModelViewSet):
+class EventViewSet(db.ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = serializers.EventSerializer
+    pagination_class = pagination.OptionalKeysetPagination
+    pagination_ordering = ("start", "id")
 
     def get_queryset(self):
-        qs = models.Event.objects.all()
         if self.action == "list":
-            now = datetime.now(timezone.utc)
-            qs = qs.filter(
-                start__lte=now,
-                end__gte=now,
-                organization__memberships__user=self.request.user,
-                organization__memberships__active=True,
-            )
-        return qs
+            return active_events(self.request.user)
+        return models.Event.objects.all()
+
+
+def active_events(user):
+    now = datetime.now(timezone.utc)
+    return models.Event.objects.filter(
+        start__lte=now,
+        end__gte=now,
+        organization__memberships__user=user,
+        organization__memberships__active=True,
+    )
 
 
 class PrizeViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = serializers.PrizeSerializer
+    pagination_class = pagination.OptionalKeysetPagination
+    pagination_ordering = ("points", "id")
 
     def get_queryset(self):
         return models.Prize.objects.filter(organization__users=self.request.user)
@@ -255,40 +492,90 @@ class PrizeViewSet(viewsets.ReadOnlyModelViewSet):
         return super().handle_exception(exc)
 
 
-class ScheduleViewSet(viewsets.ReadOnlyModelViewSet):
+class ScheduleViewSet(db.ReplicaReadMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = models.Schedule.objects.all()
+    cache_versions = ("schedules",)
+    cache_alias = "local"
     serializer_class = serializers.ScheduleSerializer
+    pagination_class = pagination.OptionalKeysetPagination
+    pagination_ordering = ("-priority", "id")
 
 
-class WeekScheduleView(ABC, views.APIView):
+class WeekScheduleView(db.ReplicaReadMixin, ABC, views.APIView):
     @abstractmethod
     def start(self, request):
         pass
 
     def get(self, r):
-        start = self.start(r)
+        return Response(week_schedule(r, self.start(r)))
+
+
+def week_start(days_ahead):
+    start = date.today() + timedelta(days=days_ahead)
+    return start - timedelta(days=start.weekday())
+
+
+def week_schedule(request, start):
+    # Schedule URLs are absolute, so each host gets its own copy
+    etag = caching.make_etag("week", request.build_absolute_uri("/"), start, *caching.get_versions("schedules"))
+    key = f"schedules:week:{etag}"
+    data = caches["local"].get(key)
+    if data is None:
         dates = [start + timedelta(days=x) for x in models.DayOfWeek]
-        weekdays = [
-            serializers.NestedScheduleSerializer(models.Schedule.get_for_day(x), context={"request": r, "date": x})
-            for x in dates
-        ]
-        return Response({"start": start, "end": start + timedelta(days=6), "weekdays": [x.data for x in weekdays]})
+        with db.reading_from(db.PRIMARY):
+            weekdays = [
+                serializers.NestedScheduleSerializer(
+                    models.Schedule.get_for_day(x), context={"request": request, "date": x}
+                ).data
+                for x in dates
+            ]
+        data = {"start": start, "end": start + timedelta(days=6), "weekdays": weekdays}
+        caches["local"].set(key, data, WEEK_CACHE_TIMEOUT)
+    return data
 
 
 class CurrentScheduleView(WeekScheduleView):
     def start(self, request):
-        start = date.today() + timedelta(days=2)
-        return start - timedelta(days=start.weekday())
+        return week_start(2)
 
 
 class NextScheduleView(WeekScheduleView):
     def start(self, request):
-        start = date.today() + timedelta(days=9)
-        return start - timedelta(days=start.weekday())
+        return week_start(9)
+
+
+class SearchView(views.APIView):
+    def get(self, request):
+        text = request.query_params.get("q", "").strip()
+        if not text:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        types = set(request.query_params.get("type", "posts,organizations,events").split(","))
+        query = search.make_query(text)
+        context = {"request": request}
+        data = {}
+
+        if "posts" in types:
+            qs = models.Post.objects.filter(published=True, inbox_items__user=request.user)
+            qs = qs.select_related("organization")
+            qs = search.search(qs, search.post_vector(), query)
+            data["posts"] = serializers.PostSerializer(qs, many=True, context=context).data
+
+        if "organizations" in types:
+            qs = search.search(catalog.get_queryset(), search.organization_vector(), query)
+            data["organizations"] = serializers.OrganizationSerializer(qs, many=True, context=context).data
+
+        if "events" in types:
+            qs = models.Event.objects.filter(
+                organization__memberships__user=request.user, organization__memberships__active=True
+            )
+            qs = search.search(qs, search.event_vector(), query)
+            data["events"] = serializers.EventSerializer(qs, many=True, context=context).data
+
+        return Response(data)
 
 
 class AppVersionView(views.APIView):
     permission_classes = ()
 
     def get(self, r):
-        return Response({"android": 26, "ios": "2.2.0"})
+        return Response(APP_VERSION)
@@ -1,17 +1,32 @@
 import random
+from functools import lru_cache
 from pathlib import Path
 
 root = Path(__file__).parent
 
-with open(root / "wordle_answers.txt") as f:
-    VALID_ANSWERS = f.read().splitlines()
 
-with open(root / "wordle_guesses.txt") as f:
-    VALID_GUESSES = [*VALID_ANSWERS, *f.read().splitlines()]
+@lru_cache(maxsize=None)
+def read_words(name):
+    with open(root / name) as f:
+        return f.read().splitlines()
+
+
+def __getattr__(name):
+    # The word lists are read on first use instead of on import
+    if name == "VALID_ANSWERS":
+        return read_words("wordle_answers.txt")
+    if name == "VALID_GUESSES":
+        return valid_guesses()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@lru_cache(maxsize=None)
+def valid_guesses():
+    return frozenset([*read_words("wordle_answers.txt"), *read_words("wordle_guesses.txt")])
 
 
 def random_answer():
-    return random.choice(VALID_ANSWERS)
+    return random.choice(read_words("wordle_answers.txt"))
 
 
 def evaluate_guess(word, guess):
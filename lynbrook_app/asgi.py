@@ -14,6 +14,7 @@ from django.core.asgi import get_asgi_application
 
 dotenv.read_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env"))
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "lynbrook_app.settings")
+# Serves the hottest read endpoints with async views
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "lynbrook_app.asgi_settings")
 
 application = get_asgi_application()
@@ -0,0 +1,4 @@
+from .settings import *  # noqa: F401,F403
+
+# Serves the hottest read endpoints with the async views in core/async_views.py
+ROOT_URLCONF = "lynbrook_app.asgi_urls"
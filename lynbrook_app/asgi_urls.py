@@ -0,0 +1,14 @@
+from django.urls import path
+
+from core import async_views
+from lynbrook_app.urls import urlpatterns as sync_urlpatterns
+
+# Used when serving over ASGI, see asgi_settings.py. Earlier patterns take precedence over the sync views.
+urlpatterns = [
+    path("api/schedules/current/", async_views.current_schedule),
+    path("api/schedules/next/", async_views.next_schedule),
+    path("api/app_version/", async_views.app_version),
+    path("api/events/", async_views.events),
+    path("api/orgs/", async_views.organizations),
+    *sync_urlpatterns,
+]
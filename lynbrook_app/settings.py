@@ -1,5 +1,3 @@
-from google.oauth2.service_account import Credentials
-
 """
 Django settings for lynbrook_app project.
 
@@ -16,6 +14,8 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -58,6 +58,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.db.PinWritesMiddleware",
 ]
 
 ROOT_URLCONF = "lynbrook_app.urls"
@@ -92,9 +93,46 @@ DATABASES = {
         "PASSWORD": os.environ["DATABASE_PASSWORD"],
         "HOST": os.environ["DATABASE_HOST"],
         "PORT": os.environ["DATABASE_PORT"],
+        # Keep connections open between requests. Behind pgbouncer in transaction mode, this reuses the
+        # client connection to pgbouncer, and server-side cursors must be off since they span transactions.
+        "CONN_MAX_AGE": int(os.getenv("DATABASE_CONN_MAX_AGE", "60")),
+        "DISABLE_SERVER_SIDE_CURSORS": os.getenv("DATABASE_PGBOUNCER", "False").lower() in ("true", "t", "1"),
+    }
+}
+
+if os.getenv("DATABASE_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["DATABASE_REPLICA_HOST"],
+        "PORT": os.getenv("DATABASE_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
     }
+
+DATABASE_ROUTERS = ["core.db.ReplicaRouter"]
+
+# The cache invalidation listener connects straight to Postgres, bypassing pgbouncer, see core/bus.py. Tests
+# turn it off, since its connection would keep the test database from being dropped.
+INVALIDATION_LISTEN = True
+INVALIDATION_LISTEN_HOST = os.getenv("DATABASE_DIRECT_HOST", DATABASES["default"]["HOST"])
+INVALIDATION_LISTEN_PORT = os.getenv("DATABASE_DIRECT_PORT", DATABASES["default"]["PORT"])
+
+CACHES = {
+    # Shared by all processes in production, e.g. CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    },
+    # Per process, for small hot data whose keys include versions from the shared cache
+    "local": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "local",
+    },
 }
 
+# Read-your-writes pins (core/db.py) must be seen by every worker, which a per-process cache can't do
+if "replica" in DATABASES and CACHES["default"]["BACKEND"].endswith(".LocMemCache"):
+    raise ImproperlyConfigured("A read replica needs a shared cache, set CACHE_BACKEND and CACHE_LOCATION")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -154,7 +192,7 @@ AUTHENTICATION_BACKENDS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.auth.CachedJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
@@ -198,10 +236,10 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static/")
 
 LOGIN_REDIRECT_URL = "/admin/"
 
-DEFAULT_FILE_STORAGE = "storages.backends.gcloud.GoogleCloudStorage"
+DEFAULT_FILE_STORAGE = "core.storage.GoogleCloudStorage"
 GS_BUCKET_NAME = "lynbrook-app"
 GS_PROJECT_ID = "lynbrook-high"
-GS_CREDENTIALS = Credentials.from_service_account_file(os.environ["GCS_CREDS"])
+GS_CREDENTIALS_FILE = os.environ["GCS_CREDS"]
 GS_DEFAULT_ACL = "authenticatedRead"
 GS_FILE_OVERWRITE = False
 
@@ -1,11 +1,14 @@
 import csv
 
+from core.matching import NameMatcher
 from core.models import Organization
 
 with open("clubs.csv") as f:
     reader = csv.DictReader(f)
     clubs = list(reader)
 
+matcher = NameMatcher((x.id, x.name) for x in Organization.objects.all())
+
 with open("clubs_out.csv", "w") as f:
     writer = csv.DictWriter(f, fieldnames=["Club Name", "Location", "Day", "Time"])
     writer.writeheader()
@@ -15,21 +18,13 @@ with open("clubs_out.csv", "w") as f:
         day = x["Day"]
         time = x["Time"]
 
-        name = name.replace("Lynbrook", "").replace("Club", "").strip()
-
-        try:
-            obj = Organization.objects.get(name__icontains=name)
-        except Organization.DoesNotExist:
-            print(name)
-        except Organization.MultipleObjectsReturned:
-            try:
-                obj = Organization.objects.get(name__icontains=name + " ")
-            except Organization.DoesNotExist:
-                print(name)
-            except Organization.MultipleObjectsReturned:
-                print("MULTIPLE", name)
+        match = matcher.best(name)
+        if match is None:
+            print("NO MATCH", name, matcher.match(name, limit=3))
+        elif match.score < 1:
+            # Left as is, since a close name can be a different club
+            print("SUGGESTED", name, "->", match.name, match.score)
         else:
-            name = obj.name
+            name = match.name
 
         writer.writerow({"Club Name": name, "Location": location, "Day": day, "Time": time})
-        # print(name, location, day, time, sep="\t\t")